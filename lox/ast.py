@@ -1,12 +1,24 @@
+import sys
 from abc import ABC
+from collections import Counter
 from dataclasses import dataclass
 from typing import Callable
-from .ctx import Ctx
-from .runtime import LoxFunction, LoxReturn, LoxClass, LoxError, truthy, show, LoxInstance
+from .ctx import MISSING, Ctx
+from .runtime import (
+    NON_INSTANCE_TYPES,
+    LoxClass,
+    LoxError,
+    LoxFunction,
+    LoxInstance,
+    LoxReturn,
+    MethodCache,
+    show,
+    truthy,
+)
 from .node import Node, Cursor
 from .errors import SemanticError
 
-KEYWORDS = {
+KEYWORDS = frozenset(map(sys.intern, {
     "and",
     "class",
     "else",
@@ -23,7 +35,7 @@ KEYWORDS = {
     "true",
     "var",
     "while",
-}
+}))
 
 """ Tipos de valores que podem aparecer durante a execução do programa"""
 Value = bool | str | float | None
@@ -37,6 +49,31 @@ class Expr(Node, ABC):
     funções, etc.
     """
 
+    # Cache de `uses()`. Não é um campo do dataclass para não aparecer nas
+    # comparações e na impressão da árvore.
+    _used_names = None
+
+    def uses(self) -> frozenset[str]:
+        """
+        Nomes de todas as variáveis lidas pela expressão.
+
+        O resultado é calculado uma única vez e guardado no nó. `replace_child`
+        descarta o cache do nó modificado, mas não o dos nós acima dele: o
+        resultado só é confiável na árvore como produzida pelo parser, que é
+        onde `validate_tree` o utiliza, antes de `desugar_tree`.
+        """
+        if self._used_names is None:
+            names: set[str] = set()
+            for child in self.children():
+                if isinstance(child, Expr):
+                    names.update(child.uses())
+            self._used_names = frozenset(names)
+        return self._used_names
+
+    def replace_child(self, old: Node, new: Node) -> None:
+        super().replace_child(old, new)
+        self._used_names = None
+
 
 class Stmt(Node, ABC):
     """
@@ -58,8 +95,10 @@ class Program(Node):
     stmts: list[Stmt]
 
     def eval(self, ctx: Ctx):
-        for stmt in self.stmts:
-            stmt.eval(ctx)
+        from .compiler import compile_program
+        from .vm import VM
+
+        VM().run(compile_program(self), ctx)
 
 
 #
@@ -94,10 +133,13 @@ class Var(Expr):
     name: str
 
     def eval(self, ctx: Ctx):
-        try:
-            return ctx[self.name]
-        except KeyError:
+        value = ctx.get(self.name, MISSING)
+        if value is MISSING:
             raise NameError(f"variável {self.name} não existe!")
+        return value
+
+    def uses(self) -> frozenset[str]:
+        return frozenset((self.name,))
 
     def validate_self(self, cursor: Cursor):
         if self.name in KEYWORDS:
@@ -114,10 +156,42 @@ class Literal(Expr):
 
     value: Value
 
+    def uses(self) -> frozenset[str]:
+        # Literais são compartilhados (ver `Literal.of`) e não guardam cache.
+        return frozenset()
+
+    @classmethod
+    def of(cls, value: Value) -> "Literal":
+        """
+        Retorna um literal compartilhado com os outros literais de mesmo
+        valor e tipo.
+
+        nil, true e false são sempre compartilhados. Números e strings são
+        guardados até o limite de `LITERAL_POOL_SIZE` valores distintos; depois
+        disso, valores novos criam literais próprios.
+        """
+        kind = type(value)
+        # O repr distingue números iguais pelo ==, como 0.0 e -0.0.
+        key = (kind, repr(value) if kind is float else value)
+        try:
+            return _LITERAL_POOL[key]
+        except KeyError:
+            literal = cls(value)
+            if len(_LITERAL_POOL) < LITERAL_POOL_SIZE:
+                _LITERAL_POOL[key] = literal
+            return literal
+
     def eval(self, ctx: Ctx):
         return self.value
 
 
+# Literais criados por `Literal.of`, indexados por tipo e valor.
+LITERAL_POOL_SIZE = 1024
+_LITERAL_POOL: dict[tuple[type, Value], Literal] = {
+    (type(value), value): Literal(value) for value in (None, True, False)
+}
+
+
 @dataclass
 class And(Expr):
     """Operador lógico 'and' com curto-circuito."""
@@ -174,10 +248,10 @@ class This(Expr):
     name: str = "this"
 
     def eval(self, ctx: Ctx):
-        try:
-            return ctx[self.name]
-        except KeyError:
+        value = ctx.get(self.name, MISSING)
+        if value is MISSING:
             raise NameError("variável this não existe!")
+        return value
 
     def validate_self(self, cursor: Cursor):
         if not cursor.is_scoped_to(Class):
@@ -195,8 +269,10 @@ class Super(Expr):
 
     def eval(self, ctx: Ctx):
         method_name = self.name
-        superclass = ctx["super"]
-        this = ctx["this"]
+        superclass = ctx.get("super", MISSING)
+        this = ctx.get("this", MISSING)
+        if superclass is MISSING or this is MISSING:
+            raise NameError("variável super não existe!")
         method = superclass.get_method(method_name)
         return method.bind(this)
 
@@ -234,15 +310,14 @@ class Getattr(Expr):
     obj: Expr
     attr: str
 
+    def __post_init__(self):
+        self._methods = MethodCache(self.attr)
+
     def eval(self, ctx: Ctx):
         value = self.obj.eval(ctx)
-        if (
-            value is None
-            or type(value) in (bool, float, str)
-            or isinstance(value, (LoxClass, LoxFunction))
-        ):
+        if type(value) in NON_INSTANCE_TYPES:
             raise LoxError("Somente instâncias têm propriedades.")
-        return getattr(value, self.attr)
+        return self._methods.get(value)
 
 @dataclass
 class Setattr(Expr):
@@ -252,11 +327,7 @@ class Setattr(Expr):
 
     def eval(self, ctx: Ctx):
         obj_value = self.obj.eval(ctx)
-        if (
-            obj_value is None
-            or type(obj_value) in (bool, float, str)
-            or isinstance(obj_value, (LoxClass, LoxFunction))
-        ):
+        if type(obj_value) in NON_INSTANCE_TYPES:
             raise LoxError("Somente instâncias tem campos")
         result = self.value.eval(ctx)
         setattr(obj_value, self.attr, result)
@@ -281,7 +352,7 @@ class Return(Stmt):
 
     def eval(self, ctx: Ctx):
         result = None if self.value is None else self.value.eval(ctx)
-        raise LoxReturn(result)
+        raise LoxReturn.shared(result)
 
     def validate_self(self, cursor: Cursor):
         if not cursor.is_scoped_to(Function):
@@ -310,13 +381,11 @@ class VarDef(Stmt):
             raise SemanticError("nome inválido", token=self.name)
         if isinstance(cursor.parent().node, Program):
             return
-        for desc in self.value.cursor().descendants():
-            node = desc.node
-            if isinstance(node, Var) and node.name == self.name:
-                raise SemanticError(
-                    "variável usada em seu próprio inicializador",
-                    token=self.name,
-                )
+        if self.name in self.value.uses():
+            raise SemanticError(
+                "variável usada em seu próprio inicializador",
+                token=self.name,
+            )
 
 @dataclass
 class If(Stmt):
@@ -342,7 +411,16 @@ class While(Stmt):
 class Block(Node):
     stmts: list[Stmt]
 
+    # Cache de `has_declarations()`. Assim como em `Expr`, não é um campo do
+    # dataclass para não aparecer nas comparações e na impressão da árvore.
+    _declares = None
+
     def eval(self, ctx: Ctx):
+        # Blocos que não declaram nada não precisam de um escopo próprio.
+        if not self.has_declarations():
+            for stmt in self.stmts:
+                stmt.eval(ctx)
+            return
         ctx = ctx.push({})
         try:
             for stmt in self.stmts:
@@ -350,13 +428,28 @@ class Block(Node):
         finally:
             ctx.pop()
 
+    def has_declarations(self) -> bool:
+        """
+        Verifica se o bloco declara variáveis, funções ou classes.
+
+        O resultado é guardado no nó na primeira chamada, depois que a árvore
+        já passou pelas transformações de `desugar_tree`.
+        """
+        if self._declares is None:
+            self._declares = any(
+                isinstance(s, (VarDef, Function, Class)) for s in self.stmts
+            )
+        return self._declares
+
+    def replace_child(self, old: Node, new: Node) -> None:
+        super().replace_child(old, new)
+        self._declares = None
+
     def validate_self(self, cursor: Cursor):
-        names: list[str] = [s.name for s in self.stmts if isinstance(s, VarDef)]
-        seen: set[str] = set()
-        for name in names:
-            if name in seen:
+        names = Counter(s.name for s in self.stmts if isinstance(s, VarDef))
+        for name, count in names.items():
+            if count > 1:
                 raise SemanticError("variável duplicada", token=name)
-            seen.add(name)
 
 @dataclass
 class Function(Stmt):
@@ -379,17 +472,14 @@ class Function(Stmt):
             if p in KEYWORDS:
                 raise SemanticError("nome inválido", token=p)
 
-        if len(set(self.params)) != len(self.params):
-            seen: set[str] = set()
-            for p in self.params:
-                if p in seen:
-                    raise SemanticError("parâmetro duplicado", token=p)
-                seen.add(p)
-
-        body_vars = [s.name for s in self.body.stmts if isinstance(s, VarDef)]
-        for name in body_vars:
-            if name in self.params:
-                raise SemanticError("nome inválido", token=name)
+        params = Counter(self.params)
+        for p, count in params.items():
+            if count > 1:
+                raise SemanticError("parâmetro duplicado", token=p)
+
+        for stmt in self.body.stmts:
+            if isinstance(stmt, VarDef) and stmt.name in params:
+                raise SemanticError("nome inválido", token=stmt.name)
             
 @dataclass
 class Class(Stmt):
@@ -412,10 +502,9 @@ class Class(Stmt):
     def eval(self, ctx: Ctx):
         superclass = None
         if self.base is not None:
-            try:
-                value = ctx[self.base]
-            except KeyError as e:
-                raise NameError(f"classe {self.base} não existe") from e
+            value = ctx.get(self.base, MISSING)
+            if value is MISSING:
+                raise NameError(f"classe {self.base} não existe")
             if not isinstance(value, LoxClass):
                 raise LoxError("Superclasse inválida")
             superclass = value
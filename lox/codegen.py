@@ -0,0 +1,610 @@
+"""
+Gera código Python para funções Lox simples.
+
+Funções que só usam variáveis locais, globais e as operações básicas da
+linguagem são traduzidas para o código-fonte de uma função Python equivalente,
+compilada uma única vez com `compile`/`exec`. A chamada passa a ser uma chamada
+comum do Python: o interpretador de bytecode do CPython executa o corpo
+diretamente, sem o laço de despacho de `lox.vm`.
+
+As verificações de tipo dos operadores são mantidas. Cada operação aritmética é
+emitida como
+
+    (_t1 + _t2 if (type(_t1 := A) is float) & (type(_t2 := B) is float)
+               else add(_t1, _t2))
+
+em que o caminho rápido usa o operador do Python e o caminho lento delega para
+a função correspondente de `lox.runtime`, que produz os erros do Lox.
+
+Construções não suportadas (métodos, `this`, `super`, funções aninhadas e
+closures que capturam variáveis locais de outras funções) fazem `emit_python`
+retornar None e a função continua sendo executada pela VM.
+
+Funções puramente numéricas com laços podem ainda ser compiladas com o numba
+(ver `compile_numba`), se ele estiver instalado.
+"""
+
+import math
+from typing import TYPE_CHECKING, Any, Callable
+
+from . import runtime
+from .ast import (
+    And,
+    Assign,
+    BinOp,
+    Block,
+    Call,
+    Expr,
+    Function,
+    Getattr,
+    If,
+    Literal,
+    Or,
+    Print,
+    Return,
+    Setattr,
+    UnaryOp,
+    Var,
+    VarDef,
+    While,
+)
+from .ctx import MISSING
+from .node import Node
+from .runtime import NON_INSTANCE_TYPES, LoxError, LoxFunction
+
+if TYPE_CHECKING:
+    from .ast import Value
+    from .compiler import Scope
+    from .ctx import Ctx
+
+__all__ = ["emit_python", "compile_numba", "compile_python"]
+
+# Operações aritméticas e comparações: operador Python usado no caminho rápido.
+FLOAT_OPERATORS = {
+    runtime.add: "+",
+    runtime.sub: "-",
+    runtime.mul: "*",
+    runtime.lt: "<",
+    runtime.le: "<=",
+    runtime.gt: ">",
+    runtime.ge: ">=",
+}
+
+# Operações que sempre retornam um bool.
+COMPARISONS = {runtime.lt, runtime.le, runtime.gt, runtime.ge, runtime.eq, runtime.ne}
+
+
+class Unsupported(Exception):
+    """
+    Sinaliza uma construção que o gerador de código não sabe traduzir.
+    """
+
+
+class PythonCodegen:
+    """
+    Traduz o corpo de uma função Lox para código-fonte Python.
+
+    As variáveis locais viram variáveis locais da função Python, com nomes
+    prefixados por "l_" e um sufixo numérico quando uma declaração esconde
+    outra de mesmo nome. Valores que não podem ser escritos como literais
+    (funções do runtime, por exemplo) são passados como variáveis globais do
+    módulo gerado.
+    """
+
+    def __init__(self, func: Function, enclosing: list["Scope"]):
+        self.func = func
+        self.enclosing = enclosing
+        self.lines: list[str] = []
+        self.indent = 1
+        self.scopes: list[dict[str, str]] = [{}]
+        self.names: set[str] = set()
+        self.temps = 0
+        self.namespace: dict[str, Any] = {
+            "_load": load_global,
+            "_store": store_global,
+            "_call": call,
+            "_LoxFunction": LoxFunction,
+            "_getattr": get_attr,
+            "_setattr": set_attr,
+            "_print": runtime.print,
+            "_eq": runtime.eq,
+            "_ne": runtime.ne,
+            "_div": runtime.truediv,
+        }
+        self.consts: dict[int, str] = {}
+
+    #
+    # Utilidades
+    #
+    def line(self, src: str) -> None:
+        self.lines.append("    " * self.indent + src)
+
+    def temp(self) -> str:
+        self.temps += 1
+        return f"_t{self.temps}"
+
+    def const(self, value: Any) -> str:
+        """
+        Nome da variável global do módulo gerado que guarda `value`.
+        """
+        try:
+            return self.consts[id(value)]
+        except KeyError:
+            name = self.consts[id(value)] = f"_k{len(self.consts)}"
+            self.namespace[name] = value
+            return name
+
+    def declare(self, name: str) -> str:
+        py_name = f"l_{name}"
+        index = 1
+        while py_name in self.names:
+            index += 1
+            py_name = f"l_{name}_{index}"
+        self.names.add(py_name)
+        self.scopes[-1][name] = py_name
+        return py_name
+
+    def resolve(self, name: str) -> str | None:
+        """
+        Nome Python de uma variável local ou None, se ela for global.
+        """
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+        for scope in self.enclosing:
+            if name in scope.names:
+                raise Unsupported(f"variável capturada: {name}")
+        return None
+
+    def is_local(self, node: Node) -> bool:
+        return isinstance(node, Var) and self.resolve(node.name) is not None
+
+    def emit(self) -> str:
+        func = self.func
+        params = [self.declare(p) for p in func.params]
+        self.stmts(func.body.stmts)
+        self.line("return None")
+        header = f"def {py_name(func.name)}({', '.join(['__ctx', *params])}):"
+        return "\n".join([header, *self.lines])
+
+    #
+    # Comandos
+    #
+    def stmt(self, node: Node) -> None:
+        if isinstance(node, Expr):
+            self.stmt_expr(node)
+            return
+        method = getattr(self, f"stmt_{type(node).__name__}", None)
+        if method is None:
+            raise Unsupported(type(node).__name__)
+        method(node)
+
+    def stmts(self, stmts: list[Node]) -> None:
+        if not stmts:
+            self.line("pass")
+        for stmt in stmts:
+            self.stmt(stmt)
+
+    def stmt_expr(self, node: Expr) -> None:
+        if isinstance(node, Assign) and (target := self.resolve(node.name)):
+            self.line(f"{target} = {self.expr(node.value)}")
+        else:
+            self.line(f"({self.expr(node)})")
+
+    def stmt_Block(self, node: Block) -> None:
+        self.scopes.append({})
+        self.stmts(node.stmts)
+        self.scopes.pop()
+
+    def stmt_Print(self, node: Print) -> None:
+        self.line(f"_print({self.expr(node.expr)})")
+
+    def stmt_Return(self, node: Return) -> None:
+        value = "None" if node.value is None else self.expr(node.value)
+        self.line(f"return {value}")
+
+    def stmt_VarDef(self, node: VarDef) -> None:
+        value = self.expr(node.value)
+        self.line(f"{self.declare(node.name)} = {value}")
+
+    def stmt_If(self, node: If) -> None:
+        self.line(f"if {self.cond(node.cond)}:")
+        self.block(node.then_branch)
+        if node.else_branch is not None:
+            self.line("else:")
+            self.block(node.else_branch)
+
+    def stmt_While(self, node: While) -> None:
+        self.line(f"while {self.cond(node.cond)}:")
+        self.block(node.body)
+
+    def block(self, node: Node) -> None:
+        self.indent += 1
+        self.stmts([node])
+        self.indent -= 1
+
+    #
+    # Expressões
+    #
+    def expr(self, node: Node) -> str:
+        method = getattr(self, f"expr_{type(node).__name__}", None)
+        if method is None:
+            raise Unsupported(type(node).__name__)
+        return method(node)
+
+    def cond(self, node: Expr) -> str:
+        """
+        Expressão Python que testa se o valor de `node` é verdadeiro no Lox.
+        """
+        if is_comparison(node):
+            return self.expr(node)
+        t = self.temp()
+        return f"(({t} := {self.expr(node)}) is not None and {t} is not False)"
+
+    def expr_Literal(self, node: Literal) -> str:
+        value = node.value
+        if value is None or isinstance(value, (bool, str)):
+            return repr(value)
+        if isinstance(value, float) and value - value == 0:
+            return repr(value)
+        return self.const(value)
+
+    def expr_Var(self, node: Var) -> str:
+        name = self.resolve(node.name)
+        if name is None:
+            return f"_load(__ctx, {node.name!r})"
+        return name
+
+    def expr_Assign(self, node: Assign) -> str:
+        name = self.resolve(node.name)
+        value = self.expr(node.value)
+        if name is None:
+            return f"_store(__ctx, {node.name!r}, {value})"
+        return f"({name} := {value})"
+
+    def expr_BinOp(self, node: BinOp) -> str:
+        left = self.expr(node.left)
+        right = self.expr(node.right)
+        if node.op is runtime.eq:
+            return f"_eq({left}, {right})"
+        if node.op is runtime.ne:
+            return f"_ne({left}, {right})"
+        if node.op not in FLOAT_OPERATORS and node.op is not runtime.truediv:
+            return f"{self.const(node.op)}({left}, {right})"
+
+        # Operandos sem efeitos colaterais são usados diretamente, sem variáveis
+        # temporárias, e números literais dispensam a verificação de tipo.
+        guards = []
+        a, b = left, right
+        if not (is_float(node.left) or self.is_local(node.left) and not has_assign(node.right)):
+            a = self.temp()
+            left = f"({a} := {left})"
+        if not (is_float(node.right) or self.is_local(node.right)):
+            b = self.temp()
+            right = f"({b} := {right})"
+        if not is_float(node.left):
+            guards.append(f"(type({left}) is float)")
+        if not is_float(node.right):
+            guards.append(f"(type({right}) is float)")
+        if not guards:
+            guards.append("True")
+        guard = " & ".join(guards)
+
+        if node.op is runtime.truediv:
+            return f"({a} / {b} if {guard} and {b} else _div({a}, {b}))"
+        slow = self.const(node.op)
+        fast = f"{a} {FLOAT_OPERATORS[node.op]} {b}"
+        return f"({fast} if {guard} else {slow}({a}, {b}))"
+
+    def expr_UnaryOp(self, node: UnaryOp) -> str:
+        operand = self.expr(node.operand)
+        if node.op is runtime.not_:
+            t = self.temp()
+            return f"(({t} := {operand}) is None or {t} is False)"
+        if node.op is runtime.neg:
+            t = self.temp()
+            return f"(-{t} if type({t} := {operand}) is float else {self.const(node.op)}({t}))"
+        return f"{self.const(node.op)}({operand})"
+
+    def expr_And(self, node: And) -> str:
+        t = self.temp()
+        left, right = self.expr(node.left), self.expr(node.right)
+        return f"({t} if ({t} := {left}) is None or {t} is False else {right})"
+
+    def expr_Or(self, node: Or) -> str:
+        t = self.temp()
+        left, right = self.expr(node.left), self.expr(node.right)
+        return f"({right} if ({t} := {left}) is None or {t} is False else {t})"
+
+    def expr_Call(self, node: Call) -> str:
+        # Funções Lox são chamadas diretamente, sem passar por `call`.
+        t = self.temp()
+        callee = self.expr(node.callee)
+        args = ", ".join(self.expr(p) for p in node.params)
+        fast = f"{t}({args})"
+        slow = f"_call({t}, {args})" if args else f"_call({t})"
+        return f"({fast} if type({t} := {callee}) is _LoxFunction else {slow})"
+
+    def expr_Getattr(self, node: Getattr) -> str:
+        cache = self.const(runtime.MethodCache(node.attr))
+        return f"_getattr({self.expr(node.obj)}, {cache})"
+
+    def expr_Setattr(self, node: Setattr) -> str:
+        obj, value = self.expr(node.obj), self.expr(node.value)
+        return f"_setattr({obj}, {node.attr!r}, {value})"
+
+
+class NumericCodegen(PythonCodegen):
+    """
+    Gera código para o numba a partir de funções que só manipulam números.
+
+    Os tipos de cada expressão são inferidos durante a geração: os parâmetros
+    são números e cada variável local mantém o tipo do seu valor inicial.
+    Como os tipos são conhecidos, as operações são emitidas sem as
+    verificações feitas por `PythonCodegen`. Qualquer construção cujo tipo não
+    possa ser determinado é rejeitada.
+    """
+
+    def __init__(self, func: Function, enclosing: list["Scope"]):
+        super().__init__(func, enclosing)
+        self.types: dict[str, type] = {}
+        self.returns: set[type] = set()
+
+    def emit(self) -> str:
+        func = self.func
+        params = [self.declare(p) for p in func.params]
+        self.types.update(dict.fromkeys(params, float))
+        self.stmts(func.body.stmts)
+        if not func.body.stmts or not isinstance(func.body.stmts[-1], Return):
+            raise Unsupported("a função pode terminar sem retornar um número")
+        if len(self.returns) != 1:
+            raise Unsupported("tipo de retorno instável")
+        header = f"def {py_name(func.name)}({', '.join(params)}):"
+        return "\n".join([header, *self.lines])
+
+    def typed(self, node: Node) -> tuple[str, type]:
+        method = getattr(self, f"typed_{type(node).__name__}", None)
+        if method is None:
+            raise Unsupported(type(node).__name__)
+        return method(node)
+
+    def expr(self, node: Node) -> str:
+        return self.typed(node)[0]
+
+    def cond(self, node: Expr) -> str:
+        src, kind = self.typed(node)
+        if kind is not bool:
+            raise Unsupported("condição não booleana")
+        return src
+
+    def stmt_expr(self, node: Expr) -> None:
+        if not isinstance(node, Assign):
+            raise Unsupported("expressão usada como comando")
+        name, src, _ = self.assignment(node)
+        self.line(f"{name} = {src}")
+
+    def stmt_Print(self, node: Print) -> None:
+        raise Unsupported("print")
+
+    def stmt_Return(self, node: Return) -> None:
+        if node.value is None:
+            raise Unsupported("return sem valor")
+        src, kind = self.typed(node.value)
+        self.returns.add(kind)
+        self.line(f"return {src}")
+
+    def stmt_VarDef(self, node: VarDef) -> None:
+        src, kind = self.typed(node.value)
+        name = self.declare(node.name)
+        self.types[name] = kind
+        self.line(f"{name} = {src}")
+
+    def typed_Literal(self, node: Literal) -> tuple[str, type]:
+        if type(node.value) is float and node.value - node.value != 0:
+            raise Unsupported("literal não finito")
+        if type(node.value) not in (float, bool):
+            raise Unsupported("literal não numérico")
+        return repr(node.value), type(node.value)
+
+    def typed_Var(self, node: Var) -> tuple[str, type]:
+        name = self.resolve(node.name)
+        if name is None:
+            raise Unsupported(f"variável global: {node.name}")
+        return name, self.types[name]
+
+    def typed_Assign(self, node: Assign) -> tuple[str, type]:
+        name, src, kind = self.assignment(node)
+        return f"({name} := {src})", kind
+
+    def assignment(self, node: Assign) -> tuple[str, str, type]:
+        name = self.resolve(node.name)
+        if name is None:
+            raise Unsupported(f"variável global: {node.name}")
+        src, kind = self.typed(node.value)
+        if kind is not self.types[name]:
+            raise Unsupported(f"tipo instável: {node.name}")
+        return name, src, kind
+
+    def typed_BinOp(self, node: BinOp) -> tuple[str, type]:
+        left, left_type = self.typed(node.left)
+        right, right_type = self.typed(node.right)
+        if left_type is not float or right_type is not float:
+            raise Unsupported("operação entre valores não numéricos")
+        if node.op is runtime.truediv:
+            return f"_div({left}, {right})", float
+        if node.op is runtime.eq:
+            return f"({left} == {right})", bool
+        if node.op is runtime.ne:
+            return f"({left} != {right})", bool
+        if node.op not in FLOAT_OPERATORS:
+            raise Unsupported("operação desconhecida")
+        kind = bool if node.op in COMPARISONS else float
+        return f"({left} {FLOAT_OPERATORS[node.op]} {right})", kind
+
+    def typed_UnaryOp(self, node: UnaryOp) -> tuple[str, type]:
+        operand, kind = self.typed(node.operand)
+        if node.op is runtime.not_ and kind is bool:
+            return f"(not {operand})", bool
+        if node.op is runtime.neg and kind is float:
+            return f"(-{operand})", float
+        raise Unsupported("operação unária")
+
+
+def emit_python(
+    func: Function, enclosing: list["Scope"] | None = None
+) -> tuple[str, dict[str, Any]] | None:
+    """
+    Retorna o código-fonte Python equivalente a `func` e o dicionário de
+    variáveis globais que ele usa, ou None se a função não puder ser traduzida.
+    """
+    codegen = PythonCodegen(func, enclosing or [])
+    try:
+        return codegen.emit(), codegen.namespace
+    except Unsupported:
+        return None
+
+
+def compile_python(
+    func: Function, enclosing: list["Scope"] | None = None
+) -> Callable[..., "Value"] | None:
+    """
+    Compila `func` para uma função Python que recebe o contexto de execução
+    seguido dos argumentos da chamada.
+    """
+    result = emit_python(func, enclosing)
+    if result is None:
+        return None
+    src, namespace = result
+    try:
+        code = compile(src, f"<lox:{func.name}>", "exec")
+    except (SyntaxError, RecursionError, MemoryError):
+        return None
+    exec(code, namespace)
+    return namespace[py_name(func.name)]
+
+
+def compile_numba(
+    func: Function, enclosing: list["Scope"] | None = None
+) -> Callable[..., "Value"] | None:
+    """
+    Compila `func` com `numba.njit`, se a função for puramente numérica e
+    tiver algum laço (do contrário o custo da compilação não compensa).
+
+    A compilação é feita imediatamente, com a assinatura explícita da função.
+    Retorna None se o numba não estiver instalado ou se falhar ao compilar: a
+    função continua sendo executada pelo código Python gerado ou pela VM. A
+    função resultante só deve ser chamada com argumentos do tipo float.
+    """
+    if not has_loop(func.body):
+        return None
+    codegen = NumericCodegen(func, enclosing or [])
+    try:
+        src = codegen.emit()
+    except Unsupported:
+        return None
+    try:
+        return _NUMBA_KERNELS[src]
+    except KeyError:
+        pass
+
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+
+    (returns,) = codegen.returns
+    params = ", ".join(["float64"] * len(func.params))
+    signature = f"{NUMBA_TYPES[returns]}({params})"
+    namespace: dict[str, Any] = {}
+    try:
+        namespace["_div"] = njit("float64(float64, float64)")(float_div)
+        exec(compile(src, f"<lox:{func.name}>", "exec"), namespace)
+        kernel = njit(signature)(namespace[py_name(func.name)])
+    except Exception:
+        kernel = None
+    _NUMBA_KERNELS[src] = kernel
+    return kernel
+
+
+# Kernels já compilados, indexados pelo código-fonte gerado. Programas
+# executados várias vezes no mesmo processo reaproveitam a compilação. Fontes
+# que o numba não conseguiu compilar ficam registrados com None.
+_NUMBA_KERNELS: dict[str, Callable[..., "Value"] | None] = {}
+
+# Tipos do numba correspondentes aos valores retornados pelas funções.
+NUMBA_TYPES = {float: "float64", bool: "boolean"}
+
+
+def float_div(a: float, b: float) -> float:
+    """
+    Divisão entre números com as mesmas regras de `runtime.truediv` para
+    divisores nulos, independentes do sinal do zero.
+    """
+    if b == 0.0:
+        if a == 0.0:
+            return math.nan
+        return math.inf if a > 0.0 else -math.inf
+    return a / b
+
+
+def py_name(name: str) -> str:
+    return f"lox_{name}"
+
+
+def is_float(node: Node) -> bool:
+    return isinstance(node, Literal) and type(node.value) is float
+
+
+def has_assign(node: Node) -> bool:
+    if isinstance(node, Assign):
+        return True
+    return any(has_assign(child) for child in node.children())
+
+
+def has_loop(node: Node) -> bool:
+    if isinstance(node, While):
+        return True
+    return any(has_loop(child) for child in node.children())
+
+
+def is_comparison(node: Node) -> bool:
+    """
+    Verifica se `node` sempre produz um bool do Python.
+    """
+    if isinstance(node, BinOp):
+        return node.op in COMPARISONS
+    return isinstance(node, UnaryOp) and node.op is runtime.not_
+
+
+#
+# Funções auxiliares usadas pelo código gerado
+#
+def load_global(ctx: "Ctx", name: str) -> "Value":
+    value = ctx.get(name, MISSING)
+    if value is MISSING:
+        raise NameError(f"variável {name} não existe!")
+    return value
+
+
+def store_global(ctx: "Ctx", name: str, value: "Value") -> "Value":
+    ctx.assign(name, value)
+    return value
+
+
+def call(func: Any, *args: "Value") -> "Value":
+    if not callable(func):
+        raise TypeError(f"{func!r} não é chamável")
+    return func(*args)
+
+
+def get_attr(obj: "Value", cache: runtime.MethodCache) -> "Value":
+    if type(obj) in NON_INSTANCE_TYPES:
+        raise LoxError("Somente instâncias têm propriedades.")
+    return cache.get(obj)
+
+
+def set_attr(obj: "Value", attr: str, value: "Value") -> "Value":
+    if type(obj) in NON_INSTANCE_TYPES:
+        raise LoxError("Somente instâncias tem campos")
+    setattr(obj, attr, value)
+    return value
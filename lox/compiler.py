@@ -0,0 +1,712 @@
+"""
+Compila a árvore sintática para bytecode.
+
+O compilador percorre a AST uma única vez e produz um objeto `Code` com uma
+sequência linear de instruções e uma tabela de constantes. O resultado é
+executado pela máquina virtual definida em `lox.vm`.
+
+Cada instrução é formada por um opcode de 1 byte, guardado em `Code.code`, e por
+um operando inteiro na mesma posição de `Code.args`. Manter os operandos já
+decodificados em uma lista paralela deixa o laço da VM com apenas duas leituras
+indexadas por instrução. Os saltos são emitidos com rótulos simbólicos e
+resolvidos para índices de instrução somente ao final, em `Compiler.assemble`.
+
+Variáveis locais são resolvidas durante a compilação. Cada chamada de função
+cria uma lista (o "env") com o env da função que a definiu na posição 0 e uma
+posição para cada variável local do corpo, inclusive as declaradas em blocos
+internos. Uma variável é então acessada por um par (profundidade, posição):
+quantos envs acima do atual ela está e o índice dentro dele. Somente nomes que
+não pertencem a nenhum escopo local (as variáveis globais e os builtins) são
+procurados pelo nome no `Ctx`.
+"""
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from . import runtime
+from .ast import (
+    And,
+    Assign,
+    BinOp,
+    Block,
+    Call,
+    Class,
+    Expr,
+    Function,
+    Getattr,
+    If,
+    Literal,
+    Or,
+    Print,
+    Program,
+    Return,
+    Setattr,
+    Super,
+    This,
+    UnaryOp,
+    Var,
+    VarDef,
+    While,
+)
+from .codegen import compile_numba, compile_python
+from .errors import SemanticError
+from .node import Node
+from .optimize import fold
+
+if TYPE_CHECKING:
+    from .ast import Stmt
+
+__all__ = ["Code", "ClassCode", "compile_program", "compile_function", "disassemble"]
+
+OPNAMES: dict[int, str] = {}
+
+
+def _op(name: str, opcode: int) -> int:
+    OPNAMES[opcode] = name
+    return opcode
+
+
+#
+# OPCODES
+#
+# Instruções sem operando.
+POP = _op("POP", 1)
+PRINT = _op("PRINT", 2)
+RETURN = _op("RETURN", 3)
+POP_ENV = _op("POP_ENV", 4)
+LOAD_NIL = _op("LOAD_NIL", 5)
+LOAD_TRUE = _op("LOAD_TRUE", 6)
+LOAD_FALSE = _op("LOAD_FALSE", 7)
+NOT = _op("NOT", 8)
+NEG = _op("NEG", 9)
+
+# Operações aritméticas e comparações genéricas (delegam para lox.runtime).
+ADD = _op("ADD", 10)
+SUB = _op("SUB", 11)
+MUL = _op("MUL", 12)
+DIV = _op("DIV", 13)
+EQ = _op("EQ", 14)
+NE = _op("NE", 15)
+LT = _op("LT", 16)
+LE = _op("LE", 17)
+GT = _op("GT", 18)
+GE = _op("GE", 19)
+
+# Versões especializadas das operações acima. O compilador emite estas
+# instruções e a VM volta para a operação genérica correspondente quando os
+# operandos não têm o tipo esperado (ver `GENERIC` e `DEOPT_THRESHOLD`).
+ADD_FLOAT = _op("ADD_FLOAT", 20)
+ADD_STR = _op("ADD_STR", 21)
+SUB_FLOAT = _op("SUB_FLOAT", 22)
+MUL_FLOAT = _op("MUL_FLOAT", 23)
+DIV_FLOAT = _op("DIV_FLOAT", 24)
+LT_FLOAT = _op("LT_FLOAT", 25)
+LE_FLOAT = _op("LE_FLOAT", 26)
+GT_FLOAT = _op("GT_FLOAT", 27)
+GE_FLOAT = _op("GE_FLOAT", 28)
+EQ_SAME_TYPE = _op("EQ_SAME_TYPE", 29)
+NE_SAME_TYPE = _op("NE_SAME_TYPE", 30)
+
+# Instruções que usam o operando.
+LOAD_CONST = _op("LOAD_CONST", 64)
+LOAD_GLOBAL = _op("LOAD_GLOBAL", 65)
+STORE_GLOBAL = _op("STORE_GLOBAL", 66)
+DEFINE_GLOBAL = _op("DEFINE_GLOBAL", 67)
+GET_ATTR = _op("GET_ATTR", 68)
+SET_ATTR = _op("SET_ATTR", 69)
+GET_SUPER = _op("GET_SUPER", 70)
+CALL = _op("CALL", 71)
+JUMP = _op("JUMP", 72)
+JUMP_IF_FALSE = _op("JUMP_IF_FALSE", 73)
+JUMP_IF_FALSE_OR_POP = _op("JUMP_IF_FALSE_OR_POP", 74)
+JUMP_IF_TRUE_OR_POP = _op("JUMP_IF_TRUE_OR_POP", 75)
+MAKE_FUNCTION = _op("MAKE_FUNCTION", 76)
+MAKE_CLASS = _op("MAKE_CLASS", 77)
+MAKE_SUBCLASS = _op("MAKE_SUBCLASS", 78)
+BINARY_OP = _op("BINARY_OP", 79)
+UNARY_OP = _op("UNARY_OP", 80)
+LOAD_DEREF = _op("LOAD_DEREF", 81)
+STORE_DEREF = _op("STORE_DEREF", 82)
+
+# Instruções cujo operando não é um índice na tabela de constantes.
+LOAD_LOCAL = _op("LOAD_LOCAL", 96)
+STORE_LOCAL = _op("STORE_LOCAL", 97)
+PUSH_ENV = _op("PUSH_ENV", 98)
+
+JUMPS = frozenset({JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP})
+CONST_OPCODES = frozenset(range(LOAD_CONST, STORE_DEREF + 1)) - JUMPS - {CALL}
+MAX_ARG = 0xFFFF
+
+# Comandos que criam nomes no escopo em que aparecem.
+DECLARATIONS = (VarDef, Function, Class)
+
+# Nome das variáveis implícitas criadas para os métodos.
+THIS = "this"
+SUPER = "super"
+
+# Literais carregados por instruções sem operando.
+LITERAL_OPCODES = {None: LOAD_NIL, True: LOAD_TRUE, False: LOAD_FALSE}
+
+# Operações unárias do runtime que possuem um opcode dedicado.
+UNARY_OPCODES = {runtime.not_: NOT, runtime.neg: NEG}
+
+# Operações binárias do runtime que possuem um opcode dedicado.
+BINARY_OPCODES = {
+    runtime.add: ADD_FLOAT,
+    runtime.sub: SUB_FLOAT,
+    runtime.mul: MUL_FLOAT,
+    runtime.truediv: DIV_FLOAT,
+    runtime.eq: EQ_SAME_TYPE,
+    runtime.ne: NE_SAME_TYPE,
+    runtime.lt: LT_FLOAT,
+    runtime.le: LE_FLOAT,
+    runtime.gt: GT_FLOAT,
+    runtime.ge: GE_FLOAT,
+}
+
+# Operação genérica usada por cada instrução especializada.
+GENERIC = {
+    ADD_FLOAT: ADD,
+    ADD_STR: ADD,
+    SUB_FLOAT: SUB,
+    MUL_FLOAT: MUL,
+    DIV_FLOAT: DIV,
+    LT_FLOAT: LT,
+    LE_FLOAT: LE,
+    GT_FLOAT: GT,
+    GE_FLOAT: GE,
+    EQ_SAME_TYPE: EQ,
+    NE_SAME_TYPE: NE,
+}
+
+# Número de falhas de tipo que uma instrução especializada tolera antes de ser
+# reescrita, no próprio bytecode, para a versão genérica.
+DEOPT_THRESHOLD = 8
+
+
+@dataclass(eq=False)
+class Code:
+    """
+    Bytecode de um programa ou do corpo de uma função.
+
+    Os opcodes ficam em um único `bytearray` e os operandos em uma lista
+    paralela, com um operando (0 se não houver) para cada instrução. Ler o
+    operando já decodificado da lista é mais rápido no CPython do que
+    decodificá-lo a partir de bytes com `struct` ou deslocamentos de bits.
+    """
+
+    name: str
+    code: bytearray
+    args: list[int]
+    consts: tuple[Any, ...]
+    params: list[str] = field(default_factory=list)
+    body: list["Stmt"] = field(default_factory=list, repr=False)
+    nlocals: int = 0
+
+    # Versão Python do corpo gerada por `lox.codegen`, quando disponível. Se
+    # existir, ela é usada no lugar do bytecode.
+    native: Callable[..., Any] | None = field(default=None, repr=False)
+
+    # Versão compilada pelo numba (ver `lox.codegen.compile_numba`), usada
+    # quando todos os argumentos da chamada são números.
+    jitted: Callable[..., Any] | None = field(default=None, repr=False)
+    misses: dict[int, int] = field(default_factory=dict, repr=False)
+
+    # Cache de LOAD_GLOBAL/STORE_GLOBAL: para cada instrução, a distância até o
+    # escopo em que o nome foi encontrado (-1 se ainda não foi resolvido).
+    # Só é válido enquanto `Ctx.version` for igual a `version`.
+    depths: list[int] = field(default_factory=list, repr=False)
+    version: int = field(default=-1, repr=False)
+
+    def __post_init__(self):
+        if not self.depths:
+            self.depths = [-1] * len(self.code)
+
+    def __str__(self) -> str:
+        return f"<code {self.name}>"
+
+
+@dataclass(eq=False)
+class ClassCode:
+    """
+    Constante usada por MAKE_CLASS/MAKE_SUBCLASS: nome da classe e o bytecode
+    de cada um dos métodos.
+    """
+
+    name: str
+    methods: list[Code]
+
+
+class Label:
+    """
+    Marca uma posição no fluxo de instruções que ainda não foi codificada.
+    """
+
+    __slots__ = ("index",)
+
+    def __init__(self):
+        self.index = -1
+
+
+class Frame:
+    """
+    Env que será criado em tempo de execução.
+
+    Uma chamada de função sempre cria um env. Blocos usam o env da função,
+    exceto quando alguma de suas variáveis é capturada por uma função interna:
+    nesse caso o bloco cria um env próprio a cada execução, para que cada
+    closure veja a sua própria cópia das variáveis.
+
+    As posições usadas por um bloco são liberadas quando ele termina e
+    reaproveitadas pelos blocos seguintes, de modo que `size` é o maior número
+    de variáveis vivas ao mesmo tempo e não o total de declarações.
+    """
+
+    __slots__ = ("parent", "size", "used")
+
+    def __init__(self, parent: "Frame | None"):
+        self.parent = parent
+        self.size = 0
+        self.used = 0
+
+    def new_slot(self) -> int:
+        # A posição 0 guarda o env pai.
+        self.used += 1
+        self.size = max(self.size, self.used)
+        return self.used
+
+
+class Scope:
+    """
+    Escopo léxico: associa os nomes declarados às posições em um `Frame`.
+    """
+
+    __slots__ = ("names", "frame", "start")
+
+    def __init__(self, frame: Frame):
+        self.names: dict[str, int] = {}
+        self.frame = frame
+        self.start = frame.used
+
+
+class Compiler:
+    """
+    Percorre a AST e acumula instruções na forma (opcode, operando).
+
+    Os operandos dos saltos são objetos `Label`, resolvidos para índices de
+    instrução somente em `assemble`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        params: list[str] | None = None,
+        scopes: list[Scope] | None = None,
+    ):
+        self.name = name
+        self.params = list(params or [])
+        self.instructions: list[tuple[int, Any]] = []
+        self.consts: list[Any] = []
+        self._const_index: dict[tuple[type, str], int] = {}
+
+        # Escopos visíveis, do mais externo para o mais interno. Um programa
+        # começa sem nenhum escopo local: seus nomes são globais.
+        self.scopes: list[Scope] = list(scopes or [])
+        self.frame = Frame(self.scopes[-1].frame if self.scopes else None)
+        if scopes is not None:
+            self.scopes.append(Scope(self.frame))
+            for param in self.params:
+                self.declare(param)
+
+    #
+    # Resolução de nomes
+    #
+    def declare(self, name: str) -> int:
+        """
+        Cria uma variável no escopo local mais interno e retorna sua posição.
+        """
+        scope = self.scopes[-1]
+        if name in scope.names:
+            raise SemanticError("variável duplicada", token=name)
+        slot = scope.names[name] = scope.frame.new_slot()
+        return slot
+
+    def resolve(self, name: str) -> tuple[int, int] | None:
+        """
+        Retorna o par (profundidade, posição) de uma variável local ou None,
+        se o nome for global.
+        """
+        for scope in reversed(self.scopes):
+            if name in scope.names:
+                depth = 0
+                frame = self.frame
+                while frame is not scope.frame:
+                    frame = frame.parent
+                    depth += 1
+                return depth, scope.names[name]
+        return None
+
+    def load(self, name: str) -> None:
+        self.access(name, LOAD_LOCAL, LOAD_DEREF, LOAD_GLOBAL)
+
+    def store(self, name: str) -> None:
+        self.access(name, STORE_LOCAL, STORE_DEREF, STORE_GLOBAL)
+
+    def access(self, name: str, local: int, deref: int, glob: int) -> None:
+        location = self.resolve(name)
+        if location is None:
+            self.emit(glob, self.const(name))
+        elif location[0] == 0:
+            self.emit(local, location[1])
+        else:
+            self.emit(deref, self.const(location))
+
+    def define(self, name: str) -> None:
+        """
+        Associa o valor no topo da pilha a um novo nome.
+        """
+        if self.scopes:
+            self.emit(STORE_LOCAL, self.declare(name))
+            self.emit(POP)
+        else:
+            self.emit(DEFINE_GLOBAL, self.const(name))
+
+    def push_scope(self, frame: Frame | None = None) -> None:
+        self.scopes.append(Scope(frame or self.frame))
+
+    def pop_scope(self) -> None:
+        scope = self.scopes.pop()
+        scope.frame.used = scope.start
+
+    #
+    # Emissão de instruções
+    #
+    def emit(self, op: int, arg: Any = 0) -> None:
+        self.instructions.append((op, arg))
+
+    def label(self) -> Label:
+        return Label()
+
+    def mark(self, label: Label) -> None:
+        label.index = len(self.instructions)
+
+    def const(self, value: Any) -> int:
+        """
+        Retorna o índice de `value` na tabela de constantes, adicionando-o se
+        necessário.
+
+        Somente valores atômicos são compartilhados. A chave inclui o tipo e o
+        `repr` para que `true` e `1` ou `0.0` e `-0.0` não sejam confundidos.
+        """
+        if value is not None and type(value) not in (bool, float, int, str):
+            self.consts.append(value)
+            return len(self.consts) - 1
+        key = (type(value), repr(value))
+        try:
+            return self._const_index[key]
+        except KeyError:
+            self.consts.append(value)
+            idx = self._const_index[key] = len(self.consts) - 1
+            return idx
+
+    def assemble(self, body: list["Stmt"] | None = None) -> Code:
+        """
+        Codifica as instruções acumuladas em um objeto `Code`.
+        """
+        code = bytearray()
+        args = []
+        for op, arg in self.instructions:
+            if op in JUMPS:
+                arg = arg.index
+            if not 0 <= arg <= MAX_ARG:
+                raise SemanticError("programa muito grande", token=self.name)
+            code.append(op)
+            args.append(arg)
+        return Code(
+            self.name,
+            code,
+            args,
+            tuple(self.consts),
+            self.params,
+            body or [],
+            self.frame.size,
+        )
+
+    #
+    # Comandos
+    #
+    def stmt(self, node: Node) -> None:
+        if isinstance(node, Expr):
+            self.expr(node)
+            self.emit(POP)
+            return
+        try:
+            method = getattr(self, f"stmt_{type(node).__name__}")
+        except AttributeError:
+            name = type(node).__name__
+            raise NotImplementedError(f"Compilação não implementada para {name}!")
+        method(node)
+
+    def stmts(self, stmts: list["Stmt"]) -> None:
+        for stmt in stmts:
+            self.stmt(stmt)
+
+    def stmt_Program(self, node: Program) -> None:
+        self.stmts(node.stmts)
+
+    def stmt_Block(self, node: Block) -> None:
+        declared = {s.name for s in node.stmts if isinstance(s, DECLARATIONS)}
+        if not declared:
+            self.stmts(node.stmts)
+            return
+        if not declared & captured_names(node):
+            self.push_scope()
+            self.stmts(node.stmts)
+            self.pop_scope()
+            return
+
+        # Variáveis capturadas por closures vivem em um env criado pelo bloco.
+        frame = self.frame = Frame(self.frame)
+        push = len(self.instructions)
+        self.emit(PUSH_ENV)
+        self.push_scope(frame)
+        self.stmts(node.stmts)
+        self.pop_scope()
+        self.emit(POP_ENV)
+        self.instructions[push] = (PUSH_ENV, frame.size)
+        self.frame = frame.parent
+
+    def stmt_Print(self, node: Print) -> None:
+        self.expr(node.expr)
+        self.emit(PRINT)
+
+    def stmt_Return(self, node: Return) -> None:
+        if node.value is None:
+            self.emit(LOAD_NIL)
+        else:
+            self.expr(node.value)
+        self.emit(RETURN)
+
+    def stmt_VarDef(self, node: VarDef) -> None:
+        self.expr(node.value)
+        self.define(node.name)
+
+    def stmt_If(self, node: If) -> None:
+        else_label = self.label()
+        self.expr(node.cond)
+        self.emit(JUMP_IF_FALSE, else_label)
+        self.stmt(node.then_branch)
+        if node.else_branch is None:
+            self.mark(else_label)
+            return
+        end = self.label()
+        self.emit(JUMP, end)
+        self.mark(else_label)
+        self.stmt(node.else_branch)
+        self.mark(end)
+
+    def stmt_While(self, node: While) -> None:
+        start = self.label()
+        end = self.label()
+        self.mark(start)
+        self.expr(node.cond)
+        self.emit(JUMP_IF_FALSE, end)
+        self.stmt(node.body)
+        self.emit(JUMP, start)
+        self.mark(end)
+
+    def stmt_Function(self, node: Function) -> None:
+        # O nome é declarado antes de compilar o corpo para permitir recursão.
+        slot = self.declare(node.name) if self.scopes else None
+        code = compile_function(node, self.scopes)
+        self.emit(MAKE_FUNCTION, self.const(code))
+        self.bind(node.name, slot)
+
+    def stmt_Class(self, node: Class) -> None:
+        slot = self.declare(node.name) if self.scopes else None
+        if node.base is not None:
+            self.load(node.base)
+
+        # Os métodos enxergam `super` (se houver uma superclasse) e `this`,
+        # cada um guardado em um env próprio criado por MAKE_SUBCLASS e por
+        # LoxFunction.bind.
+        scopes = list(self.scopes)
+        frame = self.frame
+        for name in ([SUPER] if node.base is not None else []) + [THIS]:
+            frame = Frame(frame)
+            scope = Scope(frame)
+            scope.names[name] = frame.new_slot()
+            scopes.append(scope)
+        methods = [compile_function(method, scopes) for method in node.methods]
+
+        cls = ClassCode(node.name, methods)
+        if node.base is None:
+            self.emit(MAKE_CLASS, self.const(cls))
+        else:
+            self.emit(MAKE_SUBCLASS, self.const(cls))
+        self.bind(node.name, slot)
+
+    def bind(self, name: str, slot: int | None) -> None:
+        """
+        Associa o valor no topo da pilha a um nome já declarado por `declare`
+        ou, se `slot` for None, a uma variável global.
+        """
+        if slot is None:
+            self.emit(DEFINE_GLOBAL, self.const(name))
+        else:
+            self.emit(STORE_LOCAL, slot)
+            self.emit(POP)
+
+    #
+    # Expressões
+    #
+    def expr(self, node: Node) -> None:
+        try:
+            method = getattr(self, f"expr_{type(node).__name__}")
+        except AttributeError:
+            name = type(node).__name__
+            raise NotImplementedError(f"Compilação não implementada para {name}!")
+        method(node)
+
+    def expr_Literal(self, node: Literal) -> None:
+        value = node.value
+        if value is None or type(value) is bool:
+            self.emit(LITERAL_OPCODES[value])
+        else:
+            self.emit(LOAD_CONST, self.const(value))
+
+    def expr_Var(self, node: Var) -> None:
+        self.load(node.name)
+
+    def expr_This(self, node: This) -> None:
+        self.load(THIS)
+
+    def expr_Super(self, node: Super) -> None:
+        self.load(SUPER)
+        self.load(THIS)
+        self.emit(GET_SUPER, self.const(node.name))
+
+    def expr_Assign(self, node: Assign) -> None:
+        self.expr(node.value)
+        self.store(node.name)
+
+    def expr_BinOp(self, node: BinOp) -> None:
+        self.expr(node.left)
+        self.expr(node.right)
+        opcode = BINARY_OPCODES.get(node.op)
+        if opcode == ADD_FLOAT and (is_string(node.left) or is_string(node.right)):
+            opcode = ADD_STR
+        if opcode is None:
+            self.emit(BINARY_OP, self.const(node.op))
+        else:
+            self.emit(opcode)
+
+    def expr_UnaryOp(self, node: UnaryOp) -> None:
+        self.expr(node.operand)
+        if node.op in UNARY_OPCODES:
+            self.emit(UNARY_OPCODES[node.op])
+        else:
+            self.emit(UNARY_OP, self.const(node.op))
+
+    def expr_And(self, node: And) -> None:
+        end = self.label()
+        self.expr(node.left)
+        self.emit(JUMP_IF_FALSE_OR_POP, end)
+        self.expr(node.right)
+        self.mark(end)
+
+    def expr_Or(self, node: Or) -> None:
+        end = self.label()
+        self.expr(node.left)
+        self.emit(JUMP_IF_TRUE_OR_POP, end)
+        self.expr(node.right)
+        self.mark(end)
+
+    def expr_Call(self, node: Call) -> None:
+        self.expr(node.callee)
+        for param in node.params:
+            self.expr(param)
+        self.emit(CALL, len(node.params))
+
+    def expr_Getattr(self, node: Getattr) -> None:
+        self.expr(node.obj)
+        self.emit(GET_ATTR, self.const(runtime.MethodCache(node.attr)))
+
+    def expr_Setattr(self, node: Setattr) -> None:
+        self.expr(node.obj)
+        self.expr(node.value)
+        self.emit(SET_ATTR, self.const(node.attr))
+
+
+def is_string(node: Node) -> bool:
+    """
+    Verifica se o nó é uma string literal.
+    """
+    return isinstance(node, Literal) and isinstance(node.value, str)
+
+
+def compile_program(program: Program) -> Code:
+    """
+    Compila um programa completo.
+    """
+    program = fold(program)
+    compiler = Compiler("<program>")
+    compiler.stmt(program)
+    compiler.emit(LOAD_NIL)
+    compiler.emit(RETURN)
+    return compiler.assemble(program.stmts)
+
+
+def compile_function(func: Function, scopes: list[Scope] | None = None) -> Code:
+    """
+    Compila o corpo de uma função ou método.
+
+    `scopes` são os escopos locais visíveis no ponto em que a função foi
+    declarada.
+    """
+    compiler = Compiler(func.name, func.params, scopes or [])
+    compiler.stmts(func.body.stmts)
+    compiler.emit(LOAD_NIL)
+    compiler.emit(RETURN)
+    code = compiler.assemble(func.body.stmts)
+    code.native = compile_python(func, scopes)
+    code.jitted = compile_numba(func, scopes)
+    return code
+
+
+def captured_names(node: Node) -> set[str]:
+    """
+    Nomes usados dentro das funções e métodos declarados em `node`.
+    """
+    names: set[str] = set()
+    for child in iter_nodes(node):
+        if isinstance(child, Function):
+            for desc in iter_nodes(child.body):
+                if isinstance(desc, (Var, Assign)):
+                    names.add(desc.name)
+    return names
+
+
+def iter_nodes(node: Node) -> Iterator[Node]:
+    """
+    Percorre `node` e todos os seus descendentes.
+    """
+    yield node
+    for child in node.children():
+        yield from iter_nodes(child)
+
+
+def disassemble(code: Code) -> str:
+    """
+    Representação legível do bytecode, útil para depuração.
+    """
+    lines = []
+    for pc, (op, arg) in enumerate(zip(code.code, code.args)):
+        name = OPNAMES.get(op, f"<{op}>")
+        if op in CONST_OPCODES:
+            lines.append(f"{pc:>4} {name} {arg} ({runtime.show_repr(code.consts[arg])})")
+        elif op >= LOAD_CONST:
+            lines.append(f"{pc:>4} {name} {arg}")
+        else:
+            lines.append(f"{pc:>4} {name}")
+    return "\n".join(lines)
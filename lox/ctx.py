@@ -1,7 +1,7 @@
 import math
 import time
 from dataclasses import field
-from typing import TYPE_CHECKING, Iterator, Optional, TypeVar
+from typing import TYPE_CHECKING, ClassVar, Iterator, Optional, TypeVar
 
 from lox.ast import dataclass
 
@@ -31,8 +31,12 @@ class _Builtins(dict):
 
 BUILTINS = _Builtins()
 
+# Valor padrão para `Ctx.get` que não se confunde com nenhum valor do Lox
+# (inclusive nil).
+MISSING = object()
 
-@dataclass
+
+@dataclass(slots=True)
 class Ctx:
     """
     Contexto de execução. Por enquanto é só um dicionário que armazena nomes
@@ -42,6 +46,11 @@ class Ctx:
     scope: ScopeDict = field(default_factory=dict)
     parent: Optional["Ctx"] = field(default_factory=lambda: Ctx(BUILTINS, None))
 
+    # Incrementado sempre que um nome criado em um escopo esconde outro de
+    # mesmo nome em um escopo externo. Os caches de variáveis da VM guardam o
+    # valor visto ao serem preenchidos e são descartados quando ele muda.
+    version: ClassVar[int] = 0
+
     @classmethod
     def from_dict(cls, env: ScopeDict) -> "Ctx":
         """
@@ -53,11 +62,23 @@ class Ctx:
         """
         Obtém o valor de uma variável pelo nome.
         """
-        if name in self.scope:
-            return self.scope[name]
-        elif self.parent is not None:
-            return self.parent[name]
-        raise KeyError(f"Variable '{name}' not found in context.")
+        value = self.get(name, MISSING)
+        if value is MISSING:
+            raise KeyError(f"Variable '{name}' not found in context.")
+        return value
+
+    def get(self, name: str, default: "Value" = None) -> "Value":
+        """
+        Obtém o valor de uma variável pelo nome ou `default`, se ela não
+        existir.
+        """
+        ctx: Optional[Ctx] = self
+        while ctx is not None:
+            scope = ctx.scope
+            if name in scope:
+                return scope[name]
+            ctx = ctx.parent
+        return default
 
     def __setitem__(self, name: str, value: "Value") -> None:
         """
@@ -82,6 +103,8 @@ class Ctx:
         """
         if name in self.scope and not self.is_global():
             raise KeyError(f"Variable '{name}' already defined in the current scope.")
+        if name not in self.scope and self.parent is not None and name in self.parent:
+            Ctx.version += 1
         self.scope[name] = value
 
     def assign(self, key: str, value: "Value"):
@@ -94,6 +117,19 @@ class Ctx:
             ctx = ctx.parent
         raise KeyError(f"Variable '{key}' not found in context.")
 
+    def depth(self, name: str) -> int:
+        """
+        Retorna quantos escopos acima do atual a variável foi definida.
+        """
+        ctx: Optional[Ctx] = self
+        depth = 0
+        while ctx is not None:
+            if name in ctx.scope:
+                return depth
+            ctx = ctx.parent
+            depth += 1
+        raise KeyError(f"Variable '{name}' not found in context.")
+
     def to_dict(self) -> ScopeDict:
         """
         Converte o contexto para um dicionário.
@@ -0,0 +1,141 @@
+"""
+Otimizações feitas sobre a AST antes da compilação para bytecode.
+
+A função `fold` avalia as sub-expressões formadas apenas por literais, elimina
+ramos de `if`/`while` que nunca executam e remove declarações de variáveis
+locais inicializadas com literais que nunca são lidas. A árvore original não
+é modificada: os nós alterados são copiados e os demais são reaproveitados.
+"""
+
+from dataclasses import replace
+
+from .ast import (
+    And,
+    Assign,
+    BinOp,
+    Block,
+    If,
+    Literal,
+    Or,
+    UnaryOp,
+    Var,
+    VarDef,
+    While,
+)
+from .node import Node
+from .runtime import truthy
+
+__all__ = ["fold"]
+
+
+def fold(node: Node) -> Node:
+    """
+    Retorna uma versão simplificada de `node`.
+    """
+    changes = {}
+    for name in node.__annotations__:
+        value = getattr(node, name)
+        if isinstance(value, Node):
+            new = fold(value)
+        elif isinstance(value, list):
+            new = [fold(item) if isinstance(item, Node) else item for item in value]
+            if all(a is b for a, b in zip(new, value)):
+                new = value
+        else:
+            continue
+        if new is not value:
+            changes[name] = new
+    if changes:
+        node = replace(node, **changes)
+
+    method = FOLDERS.get(type(node))
+    return node if method is None else method(node)
+
+
+def fold_BinOp(node: BinOp) -> Node:
+    if isinstance(node.left, Literal) and isinstance(node.right, Literal):
+        return constant(node, node.op, node.left.value, node.right.value)
+    return node
+
+
+def fold_UnaryOp(node: UnaryOp) -> Node:
+    if isinstance(node.operand, Literal):
+        return constant(node, node.op, node.operand.value)
+    return node
+
+
+def fold_And(node: And) -> Node:
+    if isinstance(node.left, Literal):
+        return node.right if truthy(node.left.value) else node.left
+    return node
+
+
+def fold_Or(node: Or) -> Node:
+    if isinstance(node.left, Literal):
+        return node.left if truthy(node.left.value) else node.right
+    return node
+
+
+def fold_If(node: If) -> Node:
+    if isinstance(node.cond, Literal):
+        if truthy(node.cond.value):
+            return node.then_branch
+        return Block([]) if node.else_branch is None else node.else_branch
+    return node
+
+
+def fold_While(node: While) -> Node:
+    if isinstance(node.cond, Literal) and not truthy(node.cond.value):
+        return Block([])
+    return node
+
+
+def fold_Block(node: Block) -> Node:
+    stmts = [
+        stmt
+        for i, stmt in enumerate(node.stmts)
+        if not is_dead(stmt, node.stmts[i + 1 :])
+    ]
+    if len(stmts) == len(node.stmts):
+        return node
+    return replace(node, stmts=stmts)
+
+
+FOLDERS = {
+    BinOp: fold_BinOp,
+    UnaryOp: fold_UnaryOp,
+    And: fold_And,
+    Or: fold_Or,
+    If: fold_If,
+    While: fold_While,
+    Block: fold_Block,
+}
+
+
+def constant(node: Node, op, *args) -> Node:
+    """
+    Substitui `node` pelo resultado da operação, a menos que ela falhe: nesse
+    caso o erro deve acontecer durante a execução.
+    """
+    try:
+        value = op(*args)
+    except Exception:
+        return node
+    if value is not None and type(value) not in (bool, float, str):
+        return node
+    return Literal.of(value)
+
+
+def is_dead(stmt: Node, rest: list[Node]) -> bool:
+    """
+    Verifica se `stmt` declara uma variável local, com um literal como valor
+    inicial, que não é usada pelos comandos seguintes do bloco.
+    """
+    if not isinstance(stmt, VarDef) or not isinstance(stmt.value, Literal):
+        return False
+    name = stmt.name
+    for other in rest:
+        for desc in other.descendants():
+            if isinstance(desc, (Var, Assign)) and desc.name == name:
+                return False
+    return True
@@ -5,10 +5,13 @@ Define a gramática da Linguagem e funções para realizar a análise sintática
 análise léxica, etc.
 """
 
+import os
+import stat
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Iterator
 
 from lark import Lark, Token, Tree
+from lark.lexer import PatternStr
 
 from .ast import Expr, Program
 from .transformer import LoxTransformer
@@ -17,17 +20,76 @@ DIR = Path(__file__).parent
 GRAMMAR_PATH = DIR / "grammar.lark"
 
 
-ast_parser = Lark(
-    GRAMMAR_PATH.open(),
-    transformer=LoxTransformer(),
-    parser="lalr",
-    start=["start", "expr"],
-)
-cst_parser = Lark(
-    GRAMMAR_PATH.open(),
-    parser="lalr",
-    start=["start", "expr"],
-)
+def _cache_path(name: str) -> str | bool:
+    """
+    Caminho do arquivo de cache das tabelas LALR do parser `name`, ou False
+    se o cache estiver desativado ou não houver um diretório seguro para ele.
+
+    O cache é opcional: ele só é usado se a variável de ambiente
+    `LOX_PARSER_CACHE` indicar o diretório onde guardá-lo. O Lark carrega o
+    cache com `pickle`, então o diretório deve pertencer ao usuário e apenas
+    ele pode modificá-lo.
+    """
+    base = os.environ.get("LOX_PARSER_CACHE")
+    if not base:
+        return False
+    folder = Path(base).expanduser()
+    try:
+        folder.mkdir(mode=0o700, parents=True, exist_ok=True)
+        info = folder.stat()
+    except OSError:
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return False
+    return str(folder / f"{name}_parser.cache")
+
+
+def _restore_terminal_names(parser: Lark) -> None:
+    """
+    O cache do Lark não guarda a forma original dos terminais anônimos, que
+    as mensagens de erro usam para mostrar `"<="` em vez de `__ANON_1`.
+    """
+    for terminal in parser.terminals:
+        pattern = terminal.pattern
+        if pattern.raw is None:
+            if isinstance(pattern, PatternStr):
+                pattern.raw = f'"{pattern.value}"'
+            else:
+                pattern.raw = f"/{pattern.value}/"
+
+
+def _make_parser(name: str, **options: Any) -> Lark:
+    """
+    Cria o parser LALR da gramática, reaproveitando o cache das tabelas
+    quando ele estiver ativado.
+    """
+    grammar = GRAMMAR_PATH.read_text(encoding="utf-8")
+    options.update(parser="lalr", start=["start", "expr"])
+    cache = _cache_path(name)
+    try:
+        parser = Lark(grammar, cache=cache, **options)
+    except OSError:
+        if not cache:
+            raise
+        parser = Lark(grammar, **options)
+    if cache:
+        _restore_terminal_names(parser)
+    return parser
+
+
+# Com o parser LALR, o transformador passado ao Lark é chamado a cada redução,
+# durante a própria análise sintática: nenhuma lark.Tree intermediária é criada
+# e não há uma segunda passada de `LoxTransformer.transform` sobre a árvore.
+#
+# Com `LOX_PARSER_CACHE` definida, o Lark grava no arquivo de cache o hash da
+# gramática e das opções e o reconstrói quando ele não confere, então alterar
+# `grammar.lark` invalida o cache. Cada parser usa um arquivo próprio, pois o
+# transformador não entra no hash.
+transformer = LoxTransformer()
+ast_parser = _make_parser("ast", transformer=transformer)
+cst_parser = _make_parser("cst")
 
 
 def parse(src: str) -> Program:
@@ -42,6 +104,7 @@ def parse(src: str) -> Program:
         src (str):
             Código fonte a ser analisado.
     """
+    transformer.reset()
     tree = ast_parser.parse(src, start="start")
     assert isinstance(tree, Program), f"Esperava um Program, mas recebi {type(tree)}"
     tree.validate_tree()
@@ -70,6 +133,7 @@ def parse_expr(src: str) -> Expr:
         >>> parse_expr("1 + 2 * 3").eval(Ctx())
         7
     """
+    transformer.reset()
     tree = ast_parser.parse(src, start="expr")
     assert isinstance(tree, Expr), f"Esperava um Expr, mas recebi {type(tree)}"
     tree.validate_tree()
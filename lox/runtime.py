@@ -1,5 +1,5 @@
 import builtins
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from operator import neg
 from typing import TYPE_CHECKING
 from types import BuiltinFunctionType, FunctionType
@@ -8,6 +8,7 @@ from .ctx import Ctx
 
 if TYPE_CHECKING:
     from .ast import Stmt, Value
+    from .compiler import Code
 
 __all__ = [
     "add",
@@ -29,7 +30,7 @@ __all__ = [
     "LoxInstance",
 ]
 
-@dataclass
+@dataclass(slots=True)
 class LoxClass:
     """Representa uma classe Lox."""
 
@@ -65,6 +66,9 @@ class LoxClass:
 class LoxInstance:
     """Instância de uma :class:`LoxClass`."""
 
+    # Os campos definidos pelo programa Lox ficam no __dict__.
+    __slots__ = ("__cls", "__dict__")
+
     def __init__(self, cls: LoxClass):
 
         self.__cls = cls
@@ -89,6 +93,48 @@ class LoxInstance:
         bound_init(*args)
         return self
 
+
+class MethodCache:
+    """
+    Cache de métodos de um ponto do programa que acessa o atributo `name`.
+
+    Guarda a última classe vista e o método correspondente, de modo que acessos
+    repetidos a instâncias da mesma classe não passam pelo `__getattr__` de
+    `LoxInstance` nem percorrem a cadeia de superclasses. Os métodos de uma
+    classe não mudam depois de criada, então basta comparar a identidade da
+    classe.
+    """
+
+    __slots__ = ("name", "cls", "method", "cacheable")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.cls: LoxClass | None = None
+        self.method: "LoxFunction | None" = None
+        # Nomes definidos pela própria LoxInstance têm precedência sobre os
+        # métodos da classe e não podem usar o cache.
+        self.cacheable = not hasattr(LoxInstance, name)
+
+    def __repr__(self) -> str:
+        return f"MethodCache({self.name!r})"
+
+    def get(self, value: "Value") -> "Value":
+        """
+        Equivalente a `getattr(value, self.name)`.
+        """
+        name = self.name
+        if type(value) is LoxInstance and self.cacheable and name not in value.__dict__:
+            cls = value._LoxInstance__cls
+            if cls is not self.cls:
+                try:
+                    method = cls.get_method(name)
+                except LoxError:
+                    raise AttributeError(name)
+                self.cls = cls
+                self.method = method
+            return self.method.bind(value)
+        return getattr(value, name)
+
 @dataclass
 class LoxFunction:
     """Representa uma função do Lox."""
@@ -97,6 +143,8 @@ class LoxFunction:
     params: list[str]
     body: list["Stmt"]
     ctx: Ctx
+    code: "Code | None" = field(default=None, repr=False, compare=False)
+    env: list | None = field(default=None, repr=False, compare=False)
 
     def bind(self, obj: "Value") -> "LoxFunction":
         return LoxFunction(
@@ -104,9 +152,32 @@ class LoxFunction:
             params=self.params,
             body=self.body,
             ctx=self.ctx.push({"this": obj}),
+            code=self.code,
+            env=[self.env, obj],
         )
 
     def call(self, args: list["Value"]):
+        return self(*args)
+
+    def __call__(self, *args):
+        code = self.code
+        if code is not None:
+            if len(args) != len(self.params):
+                raise LoxError(
+                    f"Expected {len(self.params)} arguments but got {len(args)}."
+                )
+            jitted = code.jitted
+            if jitted is not None and all(type(arg) is float for arg in args):
+                return jitted(*args)
+            native = code.native
+            if native is not None:
+                return native(self.ctx, *args)
+            from .vm import VM
+
+            env = [self.env, *args]
+            env.extend([None] * (code.nlocals - len(args)))
+            return VM().run(code, self.ctx, env)
+
         env = dict(zip(self.params, args, strict=True))
         ctx = self.ctx.push(env)
         try:
@@ -116,9 +187,6 @@ class LoxFunction:
             return e.value
         finally:
             ctx.pop()
-
-    def __call__(self, *args):
-        return self.call(list(args))
     
     def __str__(self) -> str:
         return f"<fn {self.name}>" 
@@ -131,6 +199,22 @@ class LoxReturn(Exception):
         self.value = value
         super().__init__()
 
+    @classmethod
+    def shared(cls, value: "Value") -> "LoxReturn":
+        """
+        Retorna a instância compartilhada de LoxReturn com o valor dado.
+
+        O valor é lido pelo `except` de `LoxFunction.call` antes que outro
+        return possa acontecer, então uma única instância basta e evita criar
+        uma exceção a cada retorno.
+        """
+        exc = _SHARED_RETURN
+        exc.value = value
+        return exc.with_traceback(None)
+
+
+_SHARED_RETURN = LoxReturn(None)
+
 
 class LoxError(Exception):
     """
@@ -141,6 +225,10 @@ class LoxError(Exception):
 nan = float("nan")
 inf = float("inf")
 
+# Tipos de valores que não aceitam acesso a atributos. São comparados pelo
+# tipo exato, pois o Lox não cria subclasses deles.
+NON_INSTANCE_TYPES = frozenset({type(None), bool, float, str, LoxClass, LoxFunction})
+
 
 def print(value: "Value"):
     """
@@ -153,30 +241,42 @@ def show(value: "Value") -> str:
     """
     Converte valor lox para string.
     """
-    if isinstance(value, LoxClass):
-        return str(value)
-    if isinstance(value, LoxInstance):
+    return _SHOW_DISPATCH.get(type(value), _show_fallback)(value)
+
+
+def _show_float(value: float) -> str:
+    return str(value).removesuffix(".0")
+
+
+def _show_fallback(value: "Value") -> str:
+    """
+    Trata os tipos que não estão em `_SHOW_DISPATCH`: subclasses e objetos
+    do Python expostos ao Lox.
+    """
+    if isinstance(value, (LoxClass, LoxInstance, LoxFunction)):
         return str(value)
-    if value is None:
-        return "nil"
-    if value is True:
-        return "true"
-    if value is False:
-        return "false"
     if isinstance(value, float):
-        text = str(value)
-        return text.removesuffix(".0")
-    if isinstance(value, LoxFunction):
-        return str(value)
+        return _show_float(value)
     if isinstance(value, type):
         return value.__name__
-    if isinstance(value, LoxInstance):
-        return f"{type(value).__name__} instance"
     if isinstance(value, (FunctionType, BuiltinFunctionType)):
         return "<native fn>"
     return str(value)
 
 
+# Conversão para string de cada tipo de valor do Lox, consultada pelo tipo
+# exato do valor.
+_SHOW_DISPATCH = {
+    type(None): lambda value: "nil",
+    bool: lambda value: "true" if value else "false",
+    float: _show_float,
+    str: str,
+    LoxClass: str,
+    LoxInstance: str,
+    LoxFunction: str,
+}
+
+
 def show_repr(value: "Value") -> str:
     """
     Mostra um valor lox, mas coloca aspas em strings.
@@ -194,7 +294,7 @@ def truthy(value: "Value") -> bool:
 
 
 def not_(value: "Value") -> bool:
-    return not truthy(value)
+    return value is False or value is None
 
 
 def _ensure_number(x: "Value") -> float:
@@ -203,6 +303,11 @@ def _ensure_number(x: "Value") -> float:
     return x
 
 
+# As operações abaixo testam primeiro o caso comum, em que os dois operandos
+# são exatamente do tipo float, e só então chamam `_ensure_number`, que aceita
+# subclasses e produz o erro.
+
+
 def add(a: "Value", b: "Value") -> "Value":
     if isinstance(a, float) and isinstance(b, float):
         return a + b
@@ -212,21 +317,30 @@ def add(a: "Value", b: "Value") -> "Value":
 
 
 def sub(a: "Value", b: "Value") -> float:
+    if type(a) is float and type(b) is float:
+        return a - b
     return _ensure_number(a) - _ensure_number(b)
 
 
 def mul(a: "Value", b: "Value") -> float:
+    if type(a) is float and type(b) is float:
+        return a * b
     return _ensure_number(a) * _ensure_number(b)
 
 def eq(a: "Value", b: "Value") -> bool:
-    if type(a) is not type(b):
+    kind = type(a)
+    if kind is not type(b):
         return False
+    if kind is float or kind is str:
+        return a == b
     if isinstance(a, LoxFunction):
         # Bound methods and functions compare by identity.
         return a is b
     return a == b
 
 def truediv(a: "Value", b: "Value") -> float:
+    if type(a) is float and type(b) is float and b:
+        return a / b
     a = _ensure_number(a)
     b = _ensure_number(b)
     if b == 0:
@@ -236,26 +350,27 @@ def truediv(a: "Value", b: "Value") -> float:
     return a / b
 
 def gt(a: "Value", b: "Value") -> bool:
+    if type(a) is float and type(b) is float:
+        return a > b
     return _ensure_number(a) > _ensure_number(b)
 
 
 def ge(a: "Value", b: "Value") -> bool:
+    if type(a) is float and type(b) is float:
+        return a >= b
     return _ensure_number(a) >= _ensure_number(b)
 
 
 def lt(a: "Value", b: "Value") -> bool:
+    if type(a) is float and type(b) is float:
+        return a < b
     return _ensure_number(a) < _ensure_number(b)
 
 
 def le(a: "Value", b: "Value") -> bool:
+    if type(a) is float and type(b) is float:
+        return a <= b
     return _ensure_number(a) <= _ensure_number(b)
 
-"""
-def eq(a: "Value", b: "Value") -> bool:
-    if type(a) is not type(b):
-        return False
-    return a == b
-"""
-
 def ne(a: "Value", b: "Value") -> bool:
     return not eq(a, b)
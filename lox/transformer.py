@@ -7,7 +7,9 @@ A resolução de vários exercícios requer a modificação ou implementação d
 métodos desta classe.
 """
 
+import sys
 from typing import Callable
+
 from lark import Transformer, v_args
 
 from . import runtime as op
@@ -16,144 +18,250 @@ from .ast import *
 from .ast import UnaryOp
 
 
-def op_handler(op: Callable):
+def direct(method: Callable) -> Callable:
     """
-    Fábrica de métodos que lidam com operações binárias na árvore sintática.
+    Marca um método que o Lark deve chamar diretamente, sem o invólucro de
+    `v_args(inline=True)`.
 
-    Recebe a função que implementa a operação em tempo de execução.
+    Métodos de terminais recebem o token e métodos de regras recebem a lista
+    de filhos, que o Lark cria a cada redução e pode ser reaproveitada.
     """
+    method.vargs_applied = True  # type: ignore[attr-defined]
+    return method
 
-    def method(self, left, right):
-        return BinOp(left, right, op)
 
-    return method
+class BinOpRule:
+    """
+    Callback das regras de operações binárias na árvore sintática.
+
+    Recebe a função que implementa a operação em tempo de execução. Não é um
+    método: o Lark o chama diretamente com a lista de filhos, sem passar pelos
+    invólucros de `v_args`. Um método definido na classe com o mesmo nome da
+    regra substitui o callback normalmente.
+    """
+
+    __slots__ = ("op",)
+
+    # Impede que `v_args(inline=True)` embrulhe o callback.
+    vargs_applied = True
+
+    def __init__(self, op: Callable):
+        self.op = op
+
+    def __call__(self, children: list) -> BinOp:
+        left, right = children
+        return BinOp(left, right, self.op)
+
+
+class _Suffix:
+    """
+    Sufixo de uma chamada (`(...)`) ou acesso a atributo (`.nome`), aplicado
+    pela regra `call` à expressão à sua esquerda.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def apply(self, callee: Expr) -> Expr:
+        raise NotImplementedError
+
+
+class _ArgSuffix(_Suffix):
+    def apply(self, callee: Expr) -> Expr:
+        return Call(callee, self.value)
+
+
+class _AttrSuffix(_Suffix):
+    def apply(self, callee: Expr) -> Expr:
+        return Getattr(callee, self.value)
 
 
 @v_args(inline=True)
 class LoxTransformer(Transformer):
+    def __init__(self, visit_tokens: bool = True):
+        super().__init__(visit_tokens)
+        self.reset()
+
+    def reset(self):
+        """
+        Prepara o transformador para um novo programa.
+
+        Dentro de uma análise, todas as ocorrências de um mesmo nome
+        compartilham o nó Var, que nunca é modificado depois de criado. O
+        cache é descartado a cada análise para que programas diferentes não
+        compartilhem nós.
+        """
+        self._vars: dict[str, Var] = {}
+
     # Programa
-    def program(self, *stmts):
-        return Program(list(stmts))
+    @direct
+    def program(self, stmts: list):
+        return Program(stmts)
 
     # Operações matemáticas básicas
-    mul = op_handler(op.mul)
-    div = op_handler(op.truediv)
-    sub = op_handler(op.sub)
-    add = op_handler(op.add)
+    mul = BinOpRule(op.mul)
+    div = BinOpRule(op.truediv)
+    sub = BinOpRule(op.sub)
+    add = BinOpRule(op.add)
 
     # Comparações
-    gt = op_handler(op.gt)
-    lt = op_handler(op.lt)
-    ge = op_handler(op.ge)
-    le = op_handler(op.le)
-    eq = op_handler(op.eq)
-    ne = op_handler(op.ne)
-
-        # Operadores lógicos
-    def or_(self, left: Expr, right: Expr):
-        return Or(left=left, right=right)
-
-    def and_(self, left: Expr, right: Expr):
-        return And(left=left, right=right)
+    gt = BinOpRule(op.gt)
+    lt = BinOpRule(op.lt)
+    ge = BinOpRule(op.ge)
+    le = BinOpRule(op.le)
+    eq = BinOpRule(op.eq)
+    ne = BinOpRule(op.ne)
+
+    # Operadores lógicos
+    @direct
+    def or_(self, children: list):
+        left, right = children
+        return Or(left, right)
+
+    @direct
+    def and_(self, children: list):
+        left, right = children
+        return And(left, right)
 
     # Outras expressões
-    def call(self, callee: Expr, *suffixes):
-        for kind, value in suffixes:
-            if kind == "args":
-                callee = Call(callee, value)
-            elif kind == "attr":
-                callee = Getattr(callee, value)
+    @direct
+    def call(self, children: list):
+        suffixes = iter(children)
+        callee = next(suffixes)
+        for suffix in suffixes:
+            callee = suffix.apply(callee)
         return callee
 
-    def args(self, params: list):
-        return ("args", params)
+    @direct
+    def args(self, children: list):
+        (params,) = children
+        return _ArgSuffix(params)
 
-    def attr(self, name: Var):
-        return ("attr", name.name)
-    def params(self, *args):
-        params = list(args)
-        return params
+    @direct
+    def attr(self, children: list):
+        (name,) = children
+        return _AttrSuffix(name.name)
+
+    @direct
+    def params(self, args: list):
+        return args
 
     # Comandos
-    def print_cmd(self, expr):
+    @direct
+    def print_cmd(self, children: list):
+        (expr,) = children
         return Print(expr)
     
 
-    def block(self, *stmts):
-        return Block(list(stmts))
+    @direct
+    def block(self, stmts: list):
+        return Block(stmts)
     
     def if_cmd(self, cond: Expr, then_branch: Stmt, else_branch: Stmt | None = None):
-        return If(cond=cond, then_branch=then_branch, else_branch=else_branch)
+        return If(cond, then_branch, else_branch)
     
-    def while_cmd(self, cond: Expr, body: Stmt):
-        return While(cond=cond, body=body)
+    @direct
+    def while_cmd(self, children: list):
+        cond, body = children
+        return While(cond, body)
 
     def var_decl(self, name: Var, value: Expr | None = None):
         if value is None:
-            value = Literal(None)
-        return VarDef(name=name.name, value=value)
+            value = Literal.of(None)
+        return VarDef(name.name, value)
 
 
+    @direct
     def VAR(self, token):
-        name = str(token)
-        return Var(name)
+        name = token.value
+        node = self._vars.get(name)
+        if node is None:
+            node = self._vars[name] = Var(sys.intern(name))
+        return node
 
+    @direct
     def NUMBER(self, token):
-        num = float(token)
-        return Literal(num)
+        num = float(token.value)
+        return Literal.of(num)
     
+    @direct
     def STRING(self, token):
-        text = str(token)[1:-1]
-        return Literal(text)
+        text = token.value[1:-1]
+        return Literal.of(text)
     
+    @direct
     def NIL(self, _):
-        return Literal(None)
+        return Literal.of(None)
 
+    @direct
     def BOOL(self, token):
-        return Literal(token == "true")
+        return Literal.of(token.value == "true")
     
-    def grouping(self, expr: Expr):
+    @direct
+    def grouping(self, children: list):
+        (expr,) = children
+        # Nós Var e Literal são compartilhados: a marcação vai em uma cópia.
+        if type(expr) is Var:
+            expr = Var(expr.name)
+        elif type(expr) is Literal:
+            expr = Literal(expr.value)
         setattr(expr, "_grouping", True)
         return expr
 
-    def getattr(self, obj, name):
-        return Getattr(obj=obj, name=name.name)
+    @direct
+    def getattr(self, children: list):
+        obj, name = children
+        return Getattr(obj, name.name)
     
-    def not_(self, value):
-        return UnaryOp(op=op.not_, operand=value)
-
-    def neg(self, value):
-        return UnaryOp(op=lambda x: -x, operand=value)
+    @direct
+    def not_(self, children: list):
+        (value,) = children
+        return UnaryOp(op.not_, value)
+
+    @direct
+    def neg(self, children: list):
+        (value,) = children
+        return UnaryOp(op.neg, value)
     
-    def assign_expr(self, target: Expr, value: Expr):
-        if isinstance(target, Var) and not getattr(target, "_grouping", False):
-            return Assign(name=target.name, value=value)
-        if isinstance(target, Getattr) and not getattr(target, "_grouping", False):
-            return Setattr(obj=target.obj, attr=target.attr, value=value)
+    @direct
+    def assign_expr(self, children: list):
+        target, value = children
+        if not getattr(target, "_grouping", False):
+            kind = type(target)
+            if kind is Var:
+                return Assign(target.name, value)
+            if kind is Getattr:
+                return Setattr(target.obj, target.attr, value)
         raise SemanticError("atribuição inválida", token="=")
 
-    def expr_stmt(self, expr: Expr):
-        return expr
-
     def empty_init(self):
-        return Literal(None)
+        return Literal.of(None)
 
     def maybe_cond(self, cond: Expr | None = None):
         if cond is None:
-            return Literal(True)
+            return Literal.of(True)
         return cond
 
     def maybe_incr(self, incr: Expr | None = None):
         if incr is None:
-            return Literal(None)
+            return Literal.of(None)
         return incr
 
-    def for_init(self, stmt):
-        return stmt
-
     def for_cmd(self, init: Stmt, cond: Expr, incr: Expr, body: Stmt):
-        loop_body = Block([body, incr])
-        while_stmt = While(cond=cond, body=loop_body)
+        # Um corpo sem declarações não tem escopo próprio: o incremento pode
+        # entrar no mesmo bloco. Com declarações, ele ficaria sujeito ao
+        # sombreamento das variáveis do laço.
+        if isinstance(body, Block) and not any(
+            isinstance(s, (VarDef, Function, Class)) for s in body.stmts
+        ):
+            loop_body = Block([*body.stmts, incr])
+        else:
+            loop_body = Block([body, incr])
+        while_stmt = While(cond, loop_body)
+        if isinstance(init, Literal) and init.value is None:
+            return while_stmt
         return Block([init, while_stmt])
     
     def function(self, name: Var, *rest):
@@ -164,9 +272,10 @@ class LoxTransformer(Transformer):
             params, body = rest  # type: ignore[misc]
 
         param_names = params or []
-        return Function(name=name.name, params=param_names, body=body)
+        return Function(name.name, param_names, body)
     
-    def param_list(self, *names: Var):
+    @direct
+    def param_list(self, names: list):
         return [n.name for n in names]
 
     def return_cmd(self, value: Expr | None = None):
@@ -180,10 +289,10 @@ class LoxTransformer(Transformer):
             params, body = rest  # type: ignore[misc]
 
         param_names = params or []
-        return Function(name=name.name, params=param_names, body=body)
+        return Function(name.name, param_names, body)
 
     def super(self, _tok, name: Var):
-        return Super(name=name.name)
+        return Super(name.name)
     
 
     def this(self, _):
@@ -197,4 +306,4 @@ class LoxTransformer(Transformer):
             methods = list(rest[1:])  # type: ignore[misc]
         else:
             methods = list(rest)
-        return Class(name=name.name, methods=methods, base=base)
\ No newline at end of file
+        return Class(name.name, methods, base)
@@ -0,0 +1,519 @@
+"""
+Máquina virtual que executa o bytecode produzido por `lox.compiler`.
+
+Todo o trabalho acontece em um único laço `while True` que lê o próximo opcode
+e despacha para o trecho correspondente em uma cadeia `if/elif` ordenada pela
+frequência das instruções. O contador de programa, o bytecode e a pilha de
+valores são variáveis locais de `VM.run`, o que evita as várias chamadas de
+métodos e buscas de atributos por nó feitas pelos métodos `eval` da AST.
+
+A cadeia só contém as instruções mais frequentes e as que alteram o contador
+de programa ou o env. As demais são funções na tabela `HANDLERS`, indexada
+pelo opcode: cada comparação a mais na cadeia custa quase tanto quanto uma
+chamada, então instruções raras ficam mais baratas na tabela e a cadeia fica
+mais curta para as frequentes.
+
+Chamadas de funções Lox que só existem como bytecode não chamam `VM.run`
+recursivamente: o estado da função atual é salvo na lista `frames` e restaurado
+por RETURN, que deixa o valor de retorno na pilha (compartilhada por todas as
+chamadas).
+"""
+
+import builtins
+import operator
+from typing import TYPE_CHECKING, Callable
+
+from .compiler import (
+    ADD,
+    ADD_FLOAT,
+    ADD_STR,
+    DEOPT_THRESHOLD,
+    DIV_FLOAT,
+    EQ_SAME_TYPE,
+    GE_FLOAT,
+    GENERIC,
+    GT_FLOAT,
+    LE_FLOAT,
+    LT_FLOAT,
+    MUL_FLOAT,
+    NE_SAME_TYPE,
+    NEG,
+    NOT,
+    SUB_FLOAT,
+    CALL,
+    DEFINE_GLOBAL,
+    DIV,
+    EQ,
+    GE,
+    GET_ATTR,
+    GET_SUPER,
+    GT,
+    JUMP,
+    JUMP_IF_FALSE,
+    JUMP_IF_FALSE_OR_POP,
+    JUMP_IF_TRUE_OR_POP,
+    LE,
+    LOAD_CONST,
+    LOAD_DEREF,
+    LOAD_GLOBAL,
+    LOAD_FALSE,
+    LOAD_LOCAL,
+    LOAD_NIL,
+    LOAD_TRUE,
+    LT,
+    MAKE_CLASS,
+    MAKE_FUNCTION,
+    MAKE_SUBCLASS,
+    MUL,
+    NE,
+    OPNAMES,
+    POP,
+    POP_ENV,
+    PRINT,
+    PUSH_ENV,
+    RETURN,
+    SET_ATTR,
+    STORE_DEREF,
+    STORE_GLOBAL,
+    STORE_LOCAL,
+    SUB,
+    UNARY_OP,
+    BINARY_OP,
+    ClassCode,
+    Code,
+)
+from .ctx import Ctx
+from .runtime import (
+    NON_INSTANCE_TYPES,
+    LoxClass,
+    LoxError,
+    LoxFunction,
+    add,
+    eq,
+    ge,
+    gt,
+    le,
+    lt,
+    mul,
+    ne,
+    neg,
+    show,
+    sub,
+    truediv,
+)
+
+if TYPE_CHECKING:
+    from .ast import Value
+
+__all__ = ["VM"]
+
+# Número máximo de chamadas aninhadas executadas por um mesmo `VM.run`.
+MAX_FRAMES = 10_000
+
+# Assinatura das funções que executam as instruções menos frequentes. Recebem a
+# pilha, o operando, o código, as variáveis globais e locais e o índice da
+# instrução.
+Handler = Callable[[list, int, Code, Ctx, list, int], None]
+
+
+class VM:
+    """
+    Interpretador de bytecode.
+    """
+
+    def run(self, code: Code, ctx: Ctx, env: list | None = None) -> "Value":
+        """
+        Executa `code` e retorna o valor de RETURN.
+
+        O env guarda as variáveis locais (ver `lox.compiler`) e `ctx`, as
+        globais. Se `env` for omitido, cria um env sem pai.
+        """
+        if env is None:
+            env = [None] * (code.nlocals + 1)
+        ops = code.code
+        args = code.args
+        consts = code.consts
+        depths = code.depths
+        stack: list["Value"] = []
+        frames: list[tuple] = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        while True:
+            op = ops[pc]
+            arg = args[pc]
+            pc += 1
+
+            if op == LOAD_LOCAL:
+                push(env[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_LOCAL:
+                env[arg] = stack[-1]
+            elif op == POP:
+                pop()
+            elif op == JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    pc = arg
+            elif op == ADD_FLOAT:
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left + right
+                else:
+                    stack[-1] = add(left, right)
+                    deopt(code, pc - 1)
+            elif op == LT_FLOAT:
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left < right
+                else:
+                    stack[-1] = lt(left, right)
+                    deopt(code, pc - 1)
+            elif op == JUMP:
+                pc = arg
+            elif op == SUB_FLOAT:
+                right = pop()
+                left = stack[-1]
+                if type(left) is float and type(right) is float:
+                    stack[-1] = left - right
+                else:
+                    stack[-1] = sub(left, right)
+                    deopt(code, pc - 1)
+            elif op == CALL:
+                if arg:
+                    params = stack[-arg:]
+                    del stack[-arg:]
+                else:
+                    params = []
+                func = pop()
+                if type(func) is not LoxFunction or (func_code := func.code) is None:
+                    if not callable(func):
+                        raise TypeError(f"{func!r} não é chamável")
+                    push(func(*params))
+                elif arg != len(func_code.params):
+                    raise LoxError(
+                        f"Expected {len(func_code.params)} arguments but got {arg}."
+                    )
+                elif func_code.jitted is not None:
+                    push(func(*params))
+                elif func_code.native is not None:
+                    push(func_code.native(func.ctx, *params))
+                else:
+                    # Funções que só têm bytecode rodam neste mesmo laço.
+                    if len(frames) >= MAX_FRAMES:
+                        raise RecursionError("pilha de chamadas cheia")
+                    frames.append((code, ops, args, consts, depths, pc, env, ctx))
+                    env = [func.env, *params]
+                    env.extend([None] * (func_code.nlocals - arg))
+                    code = func_code
+                    ops = code.code
+                    args = code.args
+                    consts = code.consts
+                    depths = code.depths
+                    ctx = func.ctx
+                    pc = 0
+            elif op == LOAD_NIL:
+                push(None)
+            elif op == RETURN:
+                if not frames:
+                    return pop()
+                code, ops, args, consts, depths, pc, env, ctx = frames.pop()
+            elif op == LOAD_GLOBAL:
+                name = consts[arg]
+                depth = depths[pc - 1]
+                if depth < 0 or code.version != Ctx.version:
+                    try:
+                        depth = resolve(code, pc - 1, ctx, name)
+                    except KeyError:
+                        raise NameError(f"variável {name} não existe!")
+                scope = ctx
+                while depth:
+                    scope = scope.parent
+                    depth -= 1
+                push(scope.scope[name])
+            elif op == GET_ATTR:
+                value = pop()
+                if type(value) in NON_INSTANCE_TYPES:
+                    raise LoxError("Somente instâncias têm propriedades.")
+                push(consts[arg].get(value))
+            elif op == JUMP_IF_FALSE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    pc = arg
+                else:
+                    pop()
+            elif op == JUMP_IF_TRUE_OR_POP:
+                value = stack[-1]
+                if value is None or value is False:
+                    pop()
+                else:
+                    pc = arg
+            elif op == LOAD_TRUE:
+                push(True)
+            elif op == LOAD_FALSE:
+                push(False)
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == PUSH_ENV:
+                env = [env] + [None] * arg
+            elif op == POP_ENV:
+                env = env[0]
+            else:
+                HANDLERS[op](stack, arg, code, ctx, env, pc - 1)
+
+
+def resolve(code: Code, index: int, ctx: Ctx, name: str) -> int:
+    """
+    Preenche o cache de variáveis da instrução em `index`.
+
+    A lista de escopos vista por uma instrução tem sempre o mesmo formato, pois
+    escopos só são criados por chamadas e blocos. A distância até o escopo que
+    define o nome só muda quando uma nova definição esconde outra mais externa,
+    o que incrementa `Ctx.version` e invalida todo o cache do código.
+    """
+    if code.version != Ctx.version:
+        code.depths[:] = [-1] * len(code.depths)
+        code.version = Ctx.version
+    depth = code.depths[index] = ctx.depth(name)
+    return depth
+
+
+def deopt(code: Code, index: int) -> None:
+    """
+    Registra uma falha de tipo na instrução especializada em `index`.
+
+    Depois de `DEOPT_THRESHOLD` falhas a instrução é reescrita no próprio
+    bytecode para a operação genérica, que não testa os tipos antes de delegar
+    para `lox.runtime`.
+    """
+    misses = code.misses
+    count = misses[index] = misses.get(index, 0) + 1
+    if count >= DEOPT_THRESHOLD:
+        code.code[index] = GENERIC[code.code[index]]
+
+
+def make_class(
+    cls: ClassCode, base: LoxClass | None, ctx: Ctx, env: list
+) -> LoxClass:
+    """
+    Cria uma classe Lox a partir do bytecode de seus métodos.
+
+    Se houver superclasse, os métodos recebem um env com `super`.
+    """
+    method_env = env if base is None else [env, base]
+    methods = {
+        method.name: LoxFunction(
+            name=method.name,
+            params=method.params,
+            body=method.body,
+            ctx=ctx,
+            code=method,
+            env=method_env,
+        )
+        for method in cls.methods
+    }
+    return LoxClass(cls.name, methods, base)
+
+
+
+#
+# Instruções despachadas pela tabela `HANDLERS`
+#
+def load_deref(stack, arg, code, ctx, env, index):
+    depth, slot = code.consts[arg]
+    while depth:
+        env = env[0]
+        depth -= 1
+    stack.append(env[slot])
+
+
+def store_deref(stack, arg, code, ctx, env, index):
+    depth, slot = code.consts[arg]
+    while depth:
+        env = env[0]
+        depth -= 1
+    env[slot] = stack[-1]
+
+
+def store_global(stack, arg, code, ctx, env, index):
+    name = code.consts[arg]
+    depth = code.depths[index]
+    if depth < 0 or code.version != Ctx.version:
+        depth = resolve(code, index, ctx, name)
+    while depth:
+        ctx = ctx.parent
+        depth -= 1
+    ctx.scope[name] = stack[-1]
+
+
+def define_global(stack, arg, code, ctx, env, index):
+    ctx.var_def(code.consts[arg], stack.pop())
+
+
+def set_attr(stack, arg, code, ctx, env, index):
+    value = stack.pop()
+    obj = stack[-1]
+    if type(obj) in NON_INSTANCE_TYPES:
+        raise LoxError("Somente instâncias tem campos")
+    setattr(obj, code.consts[arg], value)
+    stack[-1] = value
+
+
+def print_(stack, arg, code, ctx, env, index):
+    builtins.print(show(stack.pop()))
+
+
+def typed(operator: Callable, generic: Callable) -> Handler:
+    """
+    Cria o handler de uma operação especializada para dois floats.
+    """
+
+    def handler(stack, arg, code, ctx, env, index):
+        right = stack.pop()
+        left = stack[-1]
+        if type(left) is float and type(right) is float:
+            stack[-1] = operator(left, right)
+        else:
+            stack[-1] = generic(left, right)
+            deopt(code, index)
+
+    return handler
+
+
+def same_type(operator: Callable, generic: Callable) -> Handler:
+    """
+    Cria o handler de uma comparação especializada para valores de mesmo tipo.
+    """
+
+    def handler(stack, arg, code, ctx, env, index):
+        right = stack.pop()
+        left = stack[-1]
+        kind = type(left)
+        if kind is type(right) and (kind is float or kind is str):
+            stack[-1] = operator(left, right)
+        else:
+            stack[-1] = generic(left, right)
+            deopt(code, index)
+
+    return handler
+
+
+def add_str(stack, arg, code, ctx, env, index):
+    right = stack.pop()
+    left = stack[-1]
+    if type(left) is str and type(right) is str:
+        stack[-1] = left + right
+    else:
+        stack[-1] = add(left, right)
+        deopt(code, index)
+
+
+def div_float(stack, arg, code, ctx, env, index):
+    right = stack.pop()
+    left = stack[-1]
+    if type(left) is float and type(right) is float and right:
+        stack[-1] = left / right
+    else:
+        stack[-1] = truediv(left, right)
+        deopt(code, index)
+
+
+def generic(operator: Callable) -> Handler:
+    """
+    Cria o handler de uma operação binária sem especialização.
+    """
+
+    def handler(stack, arg, code, ctx, env, index):
+        right = stack.pop()
+        stack[-1] = operator(stack[-1], right)
+
+    return handler
+
+
+def binary_op(stack, arg, code, ctx, env, index):
+    right = stack.pop()
+    stack[-1] = code.consts[arg](stack[-1], right)
+
+
+def neg_(stack, arg, code, ctx, env, index):
+    value = stack[-1]
+    stack[-1] = -value if type(value) is float else neg(value)
+
+
+def unary_op(stack, arg, code, ctx, env, index):
+    stack[-1] = code.consts[arg](stack[-1])
+
+
+def get_super(stack, arg, code, ctx, env, index):
+    this = stack.pop()
+    method = stack[-1].get_method(code.consts[arg])
+    stack[-1] = method.bind(this)
+
+
+def make_function(stack, arg, code, ctx, env, index):
+    func_code: Code = code.consts[arg]
+    stack.append(
+        LoxFunction(
+            name=func_code.name,
+            params=func_code.params,
+            body=func_code.body,
+            ctx=ctx,
+            code=func_code,
+            env=env,
+        )
+    )
+
+
+def make_class_(stack, arg, code, ctx, env, index):
+    stack.append(make_class(code.consts[arg], None, ctx, env))
+
+
+def make_subclass(stack, arg, code, ctx, env, index):
+    base = stack[-1]
+    if not isinstance(base, LoxClass):
+        raise LoxError("Superclasse inválida")
+    stack[-1] = make_class(code.consts[arg], base, ctx, env)
+
+
+def invalid(stack, arg, code, ctx, env, index):
+    op = code.code[index]
+    raise RuntimeError(f"opcode inválido: {OPNAMES.get(op, op)}")
+
+
+HANDLERS: list[Handler] = [invalid] * 256
+HANDLERS[LOAD_DEREF] = load_deref
+HANDLERS[STORE_DEREF] = store_deref
+HANDLERS[STORE_GLOBAL] = store_global
+HANDLERS[DEFINE_GLOBAL] = define_global
+HANDLERS[SET_ATTR] = set_attr
+HANDLERS[PRINT] = print_
+HANDLERS[MUL_FLOAT] = typed(operator.mul, mul)
+HANDLERS[GT_FLOAT] = typed(operator.gt, gt)
+HANDLERS[GE_FLOAT] = typed(operator.ge, ge)
+HANDLERS[LE_FLOAT] = typed(operator.le, le)
+HANDLERS[EQ_SAME_TYPE] = same_type(operator.eq, eq)
+HANDLERS[NE_SAME_TYPE] = same_type(operator.ne, ne)
+HANDLERS[ADD_STR] = add_str
+HANDLERS[DIV_FLOAT] = div_float
+HANDLERS[ADD] = generic(add)
+HANDLERS[SUB] = generic(sub)
+HANDLERS[MUL] = generic(mul)
+HANDLERS[DIV] = generic(truediv)
+HANDLERS[LT] = generic(lt)
+HANDLERS[LE] = generic(le)
+HANDLERS[GT] = generic(gt)
+HANDLERS[GE] = generic(ge)
+HANDLERS[EQ] = generic(eq)
+HANDLERS[NE] = generic(ne)
+HANDLERS[BINARY_OP] = binary_op
+HANDLERS[UNARY_OP] = unary_op
+HANDLERS[NEG] = neg_
+HANDLERS[GET_SUPER] = get_super
+HANDLERS[MAKE_FUNCTION] = make_function
+HANDLERS[MAKE_CLASS] = make_class_
+HANDLERS[MAKE_SUBCLASS] = make_subclass
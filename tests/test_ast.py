@@ -0,0 +1,88 @@
+import ast as python_ast
+from pathlib import Path
+
+import pytest
+
+import lox.ast
+from lox import parse, parse_expr
+from lox.ast import Block, Class, Literal, Print, Var, VarDef
+from lox.ctx import Ctx
+
+
+def test_uses_lista_as_variáveis_lidas():
+    expr = parse_expr("a + b * a")
+    assert expr.uses() == {"a", "b"}
+
+
+def test_replace_child_descarta_o_cache_de_uses():
+    expr = parse_expr("a + b")
+    assert expr.uses() == {"a", "b"}
+    expr.replace_child(expr.left, Var("c"))
+    assert expr.uses() == {"b", "c"}
+
+
+def test_replace_child_descarta_o_cache_de_has_declarations():
+    block = Block([Print(Var("a"))])
+    assert not block.has_declarations()
+    block.replace_child(block.stmts[0], VarDef("a", Literal(1.0)))
+    assert block.has_declarations()
+    assert "_declares" not in block.pretty()
+
+
+def test_import_once():
+    assert len({id(Class), id(lox.ast.Class)}) == 1
+
+    source = Path(lox.ast.__file__).read_text(encoding="utf-8")
+    names = [
+        node.name
+        for node in python_ast.parse(source).body
+        if isinstance(node, (python_ast.ClassDef, python_ast.FunctionDef))
+    ]
+    duplicated = {name for name in names if names.count(name) > 1}
+    assert not duplicated, f"Definições repetidas em lox/ast.py: {duplicated}"
+
+
+def eval_tree(src: str, **env) -> Ctx:
+    """
+    Avalia o programa percorrendo a árvore, sem compilar para bytecode.
+    """
+    ctx = Ctx.from_dict(env)
+    for stmt in parse(src).stmts:
+        stmt.eval(ctx)
+    return ctx
+
+
+@pytest.mark.parametrize(
+    "src, expected",
+    [
+        (
+            "fun f(n) { if (n < 2) return n; return f(n - 1) + f(n - 2); }"
+            "var x = f(10);",
+            55.0,
+        ),
+        ("fun g() { return 1; } fun h() { return g() + g(); } var x = h();", 2.0),
+        (
+            "fun k() { var i = 0; while (true) { var j = i; if (j == 3) return j; i = i + 1; } }"
+            "var x = k();",
+            3.0,
+        ),
+        (
+            "fun a() { return 1; } fun b(y) { a(); return y; } fun c() { return b(a() + 1); }"
+            "var x = c();",
+            2.0,
+        ),
+        ("fun f() { fun g() { return 7; } return g; } var x = f()();", 7.0),
+    ],
+)
+def test_returns_aninhados_na_árvore(src, expected):
+    assert eval_tree(src)["x"] == expected
+
+
+def test_return_atravessa_funções_python_na_árvore():
+    src = """
+    fun inner() { return "a"; }
+    fun outer() { var r = wrap(inner); inner(); return r; }
+    var x = outer();
+    """
+    ctx = eval_tree(src, wrap=lambda f: f() + "b")
+    assert ctx["x"] == "ab"
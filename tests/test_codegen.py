@@ -0,0 +1,181 @@
+import math
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from lox import codegen, parse, runtime
+from lox.codegen import NumericCodegen, Unsupported, compile_numba, float_div, py_name
+from lox.ctx import Ctx
+
+# Função puramente numérica com um laço, candidata ao numba.
+NUMERIC_SRC = """
+fun f(a, b) {
+    var i = 0;
+    while (i < 1) i = i + 1;
+    return a / b;
+}
+"""
+
+DIVISIONS = [
+    (1.0, 2.0),
+    (1.0, 0.0),
+    (1.0, -0.0),
+    (-1.0, 0.0),
+    (0.0, 0.0),
+    (-0.0, -0.0),
+    (math.nan, 0.0),
+    (math.inf, 0.0),
+]
+
+
+def function(src: str):
+    (func,) = parse(src).stmts
+    return func
+
+
+def run(src: str) -> Ctx:
+    ctx = Ctx.from_dict({})
+    parse(src).eval(ctx)
+    return ctx
+
+
+def emit_numeric(src: str):
+    func = function(src)
+    namespace = {"_div": float_div}
+    exec(NumericCodegen(func, []).emit(), namespace)
+    return namespace[py_name(func.name)]
+
+
+@pytest.mark.parametrize("a, b", DIVISIONS)
+def test_divisão_numérica_segue_truediv(a, b):
+    assert repr(float_div(a, b)) == repr(runtime.truediv(a, b))
+    assert repr(emit_numeric(NUMERIC_SRC)(a, b)) == repr(runtime.truediv(a, b))
+
+
+@pytest.mark.parametrize(
+    "src",
+    [
+        "fun f(a) { var i = 0; while (i < a) i = i + 1; print i; return i; }",
+        'fun f(a) { var s = "x"; while (a < 1) a = a + 1; return a; }',
+        "fun f(a) { while (a < 1) a = a + 1; if (a > 2) return a; }",
+        "fun f(a) { while (a < 1) a = a + 1; return a < 1; return a; }",
+        "fun f(a) { while (a) a = a - 1; return a; }",
+        "fun f(a) { while (a < 1 and a > 0) a = a + 1; return a; }",
+    ],
+)
+def test_numeric_codegen_rejeita_funções_não_numéricas(src):
+    with pytest.raises(Unsupported):
+        NumericCodegen(function(src), []).emit()
+
+
+def test_numeric_codegen_traduz_operações_numéricas():
+    src = """
+    fun f(n) {
+        var total = 0;
+        var i = 0;
+        while (i < n) {
+            if (!(i >= 10)) total = total + -i * 2 - 1;
+            else total = total / 2;
+            i = i + 1;
+        }
+        return total;
+    }
+    """
+    kernel = emit_numeric(src)
+    assert kernel(5.0) == sum(-i * 2 - 1 for i in range(5))
+    assert kernel(11.0) == sum(-i * 2 - 1 for i in range(10)) / 2
+
+
+def test_compile_numba_sem_numba(monkeypatch):
+    monkeypatch.setattr(codegen, "_NUMBA_KERNELS", {})
+    monkeypatch.setitem(sys.modules, "numba", None)
+    assert compile_numba(function(NUMERIC_SRC)) is None
+
+
+def test_falha_do_numba_volta_para_a_vm(monkeypatch):
+    def njit(*args, **kwargs):
+        raise RuntimeError("falha de compilação")
+
+    monkeypatch.setattr(codegen, "_NUMBA_KERNELS", {})
+    monkeypatch.setitem(sys.modules, "numba", SimpleNamespace(njit=njit))
+    assert compile_numba(function(NUMERIC_SRC)) is None
+
+    ctx = run(NUMERIC_SRC + "var x = f(1, -0);")
+    assert ctx["f"].code.jitted is None
+    assert ctx["x"] == math.inf
+
+
+@pytest.mark.parametrize("a, b", DIVISIONS)
+def test_funções_compiladas_com_numba(a, b):
+    pytest.importorskip("numba")
+    kernel = compile_numba(function(NUMERIC_SRC))
+    assert kernel is not None
+    assert repr(kernel(a, b)) == repr(runtime.truediv(a, b))
+
+    func = run(NUMERIC_SRC)["f"]
+    assert func.code.jitted is not None
+    assert repr(func(a, b)) == repr(runtime.truediv(a, b))
+
+
+OPERATIONS = """
+fun div(a, b) { return a / b; }
+fun neg(a) { return -a; }
+fun not(a) { return !a; }
+fun both(a, b) { return a and b; }
+fun either(a, b) { return a or b; }
+fun lazy(a) { return a or boom(); }
+"""
+
+
+@pytest.fixture
+def operations():
+    def boom():
+        raise AssertionError("o operador `or` deveria ter parado antes")
+
+    ctx = Ctx.from_dict({"boom": boom})
+    parse(OPERATIONS).eval(ctx)
+    return ctx
+
+
+@pytest.mark.parametrize("name", ["div", "neg", "not", "both", "either", "lazy"])
+def test_funções_simples_são_traduzidas_para_python(operations, name):
+    assert operations[name].code.native is not None
+
+
+@pytest.mark.parametrize("a, b", DIVISIONS)
+def test_divisão_no_código_gerado(operations, a, b):
+    assert repr(operations["div"](a, b)) == repr(runtime.truediv(a, b))
+
+
+def test_operações_unárias_no_código_gerado(operations):
+    assert operations["neg"](2.0) == -2.0
+    assert repr(operations["neg"](0.0)) == "-0.0"
+    assert operations["not"](None) is True
+    assert operations["not"](False) is True
+    assert operations["not"](0.0) is False
+    assert operations["not"]("") is False
+
+
+def test_operadores_lógicos_no_código_gerado(operations):
+    assert operations["both"](None, 1.0) is None
+    assert operations["both"](1.0, "x") == "x"
+    assert operations["either"](False, "x") == "x"
+    assert operations["either"](0.0, "x") == 0.0
+    assert operations["lazy"](1.0) == 1.0
+
+
+@pytest.mark.parametrize(
+    "name, op, args",
+    [
+        ("div", runtime.truediv, ("a", 1.0)),
+        ("div", runtime.truediv, (1.0, None)),
+        ("neg", runtime.neg, ("a",)),
+        ("neg", runtime.neg, (None,)),
+    ],
+)
+def test_erros_de_tipo_no_código_gerado(operations, name, op, args):
+    with pytest.raises(Exception) as expected:
+        op(*args)
+    with pytest.raises(expected.type):
+        operations[name](*args)
@@ -0,0 +1,103 @@
+import copy
+
+import pytest
+
+from lox import parse
+from lox.ast import BinOp, Block, Literal, Print, Var, VarDef
+from lox.compiler import compile_program
+from lox.ctx import Ctx
+from lox.optimize import fold
+from lox.vm import VM
+
+
+def folded(src: str):
+    return fold(parse(src)).stmts
+
+
+@pytest.mark.parametrize(
+    "src, expected",
+    [
+        ("if (true) print 1; else print 2;", [Print(Literal(1.0))]),
+        ('if ("") print 1; else print 2;', [Print(Literal(1.0))]),
+        ("if (nil) print 1; else print 2;", [Print(Literal(2.0))]),
+        ("if (false) print 1;", [Block([])]),
+        ("while (false) print 1;", [Block([])]),
+    ],
+)
+def test_ramos_mortos_são_removidos(src, expected):
+    assert folded(src) == expected
+
+
+def test_condição_calculada_a_partir_de_literais():
+    assert folded("if (1 < 2 and !nil) print 1; else print 2;") == [
+        Print(Literal(1.0))
+    ]
+
+
+def test_condição_variável_mantém_os_dois_ramos():
+    program = parse("if (x) print 1; else print 2;")
+    assert fold(program) is program
+
+
+@pytest.mark.parametrize(
+    "src, value",
+    [
+        ("print 1 + 2 * 3;", 7.0),
+        ('print "a" + "b";', "ab"),
+        ("print 1 < 2;", True),
+        ("print -(1);", -1.0),
+        ("print !nil;", True),
+        ("print nil and x;", None),
+        ("print 1 or x;", 1.0),
+    ],
+)
+def test_operações_com_literais_viram_literais(src, value):
+    assert folded(src) == [Print(Literal(value))]
+
+
+def test_operadores_lógicos_reduzem_para_o_lado_direito():
+    assert folded("print false or x;") == [Print(Var("x"))]
+    assert folded("print true and x;") == [Print(Var("x"))]
+
+
+@pytest.mark.parametrize("src", ['print "a" + 1;', 'print -"a";', "print 1 / nil;"])
+def test_operações_que_falham_ficam_para_a_execução(src):
+    assert folded(src) == parse(src).stmts
+
+
+def test_divisão_por_zero_mantém_o_sinal():
+    (stmt,) = folded("print -1 / 0;")
+    assert stmt.expr.value == float("-inf")
+    assert repr(folded("print -0;")[0].expr.value) == "-0.0"
+
+
+def test_variáveis_locais_não_usadas_são_removidas():
+    (block,) = folded("{ var a = 1; var b = 2; var c = f(); print b; }")
+    assert [stmt.name for stmt in block.stmts if isinstance(stmt, VarDef)] == [
+        "b",
+        "c",
+    ]
+
+
+def test_variável_atribuída_depois_é_mantida():
+    (block,) = folded("{ var a = 1; a = 2; }")
+    assert isinstance(block.stmts[0], VarDef)
+
+
+def test_fold_não_modifica_a_árvore_original():
+    program = parse("{ var a = 1; if (true) print 1 + 2; else print a; }")
+    original = copy.deepcopy(program)
+    fold(program)
+    assert program == original
+    assert isinstance(program.stmts[0].stmts[1].then_branch.expr, BinOp)
+
+
+def test_programa_simplificado_executa_o_ramo_certo():
+    src = """
+    var x = 0;
+    if (1 > 2) x = 1; else { var unused = 3; x = 2 + 2; }
+    while (false) x = 10;
+    """
+    ctx = Ctx.from_dict({})
+    VM().run(compile_program(parse(src)), ctx)
+    assert ctx["x"] == 4.0
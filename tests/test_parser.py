@@ -0,0 +1,112 @@
+import os
+
+import pytest
+from lark import UnexpectedInput, v_args
+
+from lox import parse
+from lox.ast import BinOp, Literal
+from lox.parser import _cache_path, _make_parser, parse_cst
+from lox.transformer import LoxTransformer
+
+
+def test_programas_diferentes_não_compartilham_nós():
+    first = parse("var a = 1; var b = 2; print a + b;")
+    second = parse("var a = 10; var b = 20; print a + b;")
+
+    expr = first.stmts[2].expr
+    assert isinstance(expr, BinOp)
+    expr.replace_child(expr.left, Literal(100.0))
+
+    assert second.stmts[2].expr.left != Literal(100.0)
+    assert second.stmts[2].expr is not expr
+
+
+def test_subexpressões_repetidas_são_nós_distintos():
+    program = parse("print 1 + 2; print 1 + 2;")
+    first, second = (stmt.expr for stmt in program.stmts)
+    assert first == second
+    assert first is not second
+
+
+def test_strings_repetidas_compartilham_o_literal():
+    program = parse('print "abc"; print "abc";')
+    first, second = (stmt.expr for stmt in program.stmts)
+    assert first is second
+    assert first.value is second.value
+
+
+def test_variáveis_são_compartilhadas_apenas_dentro_de_um_programa():
+    program = parse("print a; print a;")
+    first, second = (stmt.expr for stmt in program.stmts)
+    assert first is second
+
+    other = parse("print a;")
+    assert other.stmts[0].expr is not first
+
+
+def test_parênteses_não_marcam_outras_ocorrências():
+    program = parse("var a; print (a); a = 1; print (a + 1); print a + 1;")
+    assert program.stmts[2].name == "a"
+    assert not getattr(program.stmts[4].expr, "_grouping", False)
+    assert not getattr(parse("print a + 1;").stmts[0].expr, "_grouping", False)
+
+
+def test_métodos_definidos_na_classe_substituem_as_regras_binárias():
+    @v_args(inline=True)
+    class Transformer(LoxTransformer):
+        def add(self, left, right):
+            return ("add", left, right)
+
+    tree = Transformer().transform(parse_cst("1 + 2 * 3", expr=True))
+    assert tree[0] == "add"
+    assert isinstance(tree[2], BinOp)
+
+
+def test_erros_de_sintaxe_mostram_os_terminais_anônimos():
+    with pytest.raises(UnexpectedInput) as exc:
+        parse("print this_is;")
+    assert '"<="' in str(exc.value)
+    assert "__ANON" not in str(exc.value)
+
+
+def syntax_error(parser, src: str) -> list[str]:
+    # O Lark lista os terminais esperados a partir de um conjunto, em uma
+    # ordem que muda entre o parser novo e o carregado do cache.
+    with pytest.raises(UnexpectedInput) as exc:
+        parser.parse(src, start="start")
+    return sorted(str(exc.value).splitlines())
+
+
+def test_erros_de_sintaxe_com_tabelas_em_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOX_PARSER_CACHE", raising=False)
+    expected = syntax_error(_make_parser("cst"), "print this_is;")
+    assert '\t* "<="' in expected
+
+    monkeypatch.setenv("LOX_PARSER_CACHE", str(tmp_path / "lox"))
+    cold = syntax_error(_make_parser("cst"), "print this_is;")
+    assert (tmp_path / "lox" / "cst_parser.cache").exists()
+    warm = syntax_error(_make_parser("cst"), "print this_is;")
+    assert cold == warm == expected
+
+
+def test_cache_é_opcional(tmp_path, monkeypatch):
+    monkeypatch.delenv("LOX_PARSER_CACHE", raising=False)
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    assert _cache_path("ast") is False
+    _make_parser("cst")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_fica_em_diretório_privado(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOX_PARSER_CACHE", str(tmp_path / "lox"))
+    path = _cache_path("ast")
+    assert path == str(tmp_path / "lox" / "ast_parser.cache")
+    assert os.stat(tmp_path / "lox").st_mode & 0o077 == 0
+
+
+def test_cache_é_ignorado_em_diretório_compartilhado(tmp_path, monkeypatch):
+    monkeypatch.setenv("LOX_PARSER_CACHE", str(tmp_path / "lox"))
+    (tmp_path / "lox").mkdir()
+    os.chmod(tmp_path / "lox", 0o777)
+    assert _cache_path("ast") is False
@@ -0,0 +1,134 @@
+import pytest
+
+from lox import parse
+from lox.compiler import (
+    ADD,
+    ADD_FLOAT,
+    DEOPT_THRESHOLD,
+    DIV,
+    DIV_FLOAT,
+    EQ,
+    EQ_SAME_TYPE,
+    ClassCode,
+    compile_program,
+)
+from lox.ctx import Ctx
+from lox.vm import MAX_FRAMES, VM
+
+# Concatena strings com uma soma entre variáveis, que o compilador emite como
+# ADD_FLOAT. A primeira soma do bytecode é `s + t`: o incremento do `for` vem
+# depois do corpo.
+CONCAT = """
+var s = "";
+var t = "a";
+for (var i = 0; i < {n}; i = i + 1) s = s + t;
+"""
+
+
+def run(code, **env) -> Ctx:
+    ctx = Ctx.from_dict(env)
+    VM().run(code, ctx)
+    return ctx
+
+
+def positions(code, opcode: int) -> list[int]:
+    return [i for i, op in enumerate(code.code) if op == opcode]
+
+
+def test_soma_com_tipos_misturados_volta_para_a_operação_genérica():
+    code = compile_program(parse(CONCAT.format(n=20)))
+    index = positions(code, ADD_FLOAT)[0]
+
+    ctx = run(code)
+    assert ctx["s"] == "a" * 20
+    assert code.code[index] == ADD
+    assert code.misses[index] == DEOPT_THRESHOLD
+
+
+def test_poucas_falhas_de_tipo_mantêm_a_instrução_especializada():
+    code = compile_program(parse(CONCAT.format(n=DEOPT_THRESHOLD - 1)))
+    index = positions(code, ADD_FLOAT)[0]
+
+    ctx = run(code)
+    assert ctx["s"] == "a" * (DEOPT_THRESHOLD - 1)
+    assert code.code[index] == ADD_FLOAT
+
+
+def test_comparação_entre_tipos_diferentes_em_um_método():
+    # O uso de `this` mantém o método no bytecode da VM.
+    src = """
+    class A {
+        count(n, other) {
+            var total = this.start;
+            for (var i = 0; i < n; i = i + 1) {
+                if (i == other) total = total + 1;
+            }
+            return total;
+        }
+    }
+    var a = A();
+    a.start = 0;
+    var x = a.count(20, "a");
+    var y = a.count(20, 3);
+    """
+    code = compile_program(parse(src))
+    (cls,) = [const for const in code.consts if isinstance(const, ClassCode)]
+    (method,) = cls.methods
+    index = positions(method, EQ_SAME_TYPE)[0]
+
+    ctx = run(code)
+    assert ctx["x"] == 0
+    assert ctx["y"] == 1
+    assert method.code[index] == EQ
+
+
+def test_divisão_por_zero_volta_para_a_operação_genérica():
+    src = """
+    var x = 0;
+    var zero = 0;
+    for (var i = 0; i < 10; i = i + 1) x = 1 / zero;
+    """
+    code = compile_program(parse(src))
+    (index,) = positions(code, DIV_FLOAT)
+
+    ctx = run(code)
+    assert ctx["x"] == float("inf")
+    assert code.code[index] == DIV
+
+
+def test_recursão_profunda_de_métodos_não_usa_a_pilha_do_python():
+    src = f"""
+    class A {{
+        down(n) {{
+            if (n == 0) return 0;
+            return this.down(n - 1) + 1;
+        }}
+    }}
+    var x = A().down({MAX_FRAMES - 10});
+    """
+    ctx = run(compile_program(parse(src)))
+    assert ctx["x"] == MAX_FRAMES - 10
+
+
+def test_recursão_infinita_enche_a_pilha_de_chamadas():
+    src = """
+    class A {
+        loop(n) { return this.loop(n + 1); }
+    }
+    A().loop(0);
+    """
+    with pytest.raises(RecursionError, match="pilha de chamadas cheia"):
+        run(compile_program(parse(src)))
+
+
+def test_funções_compiladas_são_mostradas_como_no_interpretador():
+    src = "fun f(a) { return a; }"
+    compiled = run(compile_program(parse(src)))["f"]
+    ctx = Ctx.from_dict({})
+    parse(src).eval(ctx)
+    interpreted = ctx["f"]
+
+    assert compiled.code is not None
+    assert "code=" not in repr(compiled)
+    assert "env=" not in repr(compiled)
+    assert repr(compiled) == repr(interpreted)